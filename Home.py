@@ -6,27 +6,15 @@ import plotly.express as px
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
+from orders import open_store
+from orders.aggregates import PRICE_BIN
+from orders.charts import prepare
+from orders.density import ecdf_points, price_distribution
 
+# Time slot sizes offered for the day/time heatmap, in minutes
+TIME_SLOTS = {"15 minutes": 15, "Hourly": 60, "3 hours": 180}
 
 
-def preprocess_data(filepath):
-    df = pd.read_csv(filepath)
-
-    # Data cleaning
-    df['Food2'].fillna('None', inplace=True)
-    df['Quantity2'].fillna('None', inplace=True)
-    df = df.replace('Manchurian', 'Manchuria')
-    df = df.replace('The pancake co', 'The Pancake co')
-    df = df.replace("L Pino'z", 'La Pinoz')
-    df = df.replace("La Pinozo", 'La Pinoz')
-    df = df.replace("The Good Bowl", 'Good Bowl')
-    df = df.replace("The Nomads Cafe", 'Nomads Cafe')
-    df.iloc[94, df.columns.get_loc('Date ')] = '10/20/24'
-    df['Date '] = pd.to_datetime(df['Date '])
-
-    return df
-
 # Function to generate a donut chart with custom colors
 def generate_donut_chart(platform_counts):
     color_map = {
@@ -46,9 +34,7 @@ def generate_donut_chart(platform_counts):
     fig.update_layout(height=480)
     return fig
 
-def generate_payment_pie_chart(df):
-    mode_of_payment_counts = df['Mode of Payment'].value_counts()
-
+def generate_payment_pie_chart(mode_of_payment_counts):
     color_map = {
         'UPI': 'red',  # Set Zomato to red
         'COD': 'orange'  # Set Swiggy to orange
@@ -97,14 +83,27 @@ def generate_scatter_plot(df):
 
 
 
-def generate_price_histogram(df):
-    fig = ff.create_distplot(
-        [df["Price"]], 
-        ["Price Distribution"], 
-        bin_size=20, 
-        curve_type='kde', 
-        colors=['blue']
-    )
+def generate_price_histogram(distribution, bin_size=20):
+    # Histogram bins and KDE curve come from price_distribution; only their points are sent to the browser
+    (edges, densities), (grid, kde) = distribution
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=edges + bin_size / 2,
+        y=densities,
+        width=bin_size,
+        marker_color="blue",
+        opacity=0.7,
+        name="Price Distribution"
+    ))
+    fig.add_trace(go.Scatter(
+        x=grid,
+        y=kde,
+        mode="lines",
+        line=dict(color="blue"),
+        name="Price Distribution",
+        showlegend=False
+    ))
 
     fig.update_layout(
         title="Price Distribution with Histogram and KDE Curve",
@@ -117,7 +116,7 @@ def generate_price_histogram(df):
     return fig
 
 
-def generate_day_distribution_plot(df):
+def generate_day_distribution_plot(day_counts):
     # day_counts = df['Day'].value_counts().reset_index()
     # day_counts.columns = ['Day', 'Count']  # Rename columns
 
@@ -139,33 +138,11 @@ def generate_day_distribution_plot(df):
     # )
 
     # return fig
-    # Ensure the "Date " column is in datetime format and sort the DataFrame by date
-    df["Date "] = pd.to_datetime(df["Date "])
-    df_sorted = df.sort_values("Date ")
-    
     # Define the desired day order
     day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
     
-    # Create a pivot table: rows are dates, columns are days, values are order counts
-    pivot = df_sorted.groupby(["Date ", "Day"]).size().unstack(fill_value=0)
-    
-    # Reindex the columns to enforce the week order; missing days are filled with 0
-    pivot = pivot.reindex(columns=day_order, fill_value=0)
-    
-    # Compute the cumulative sum along the date axis so counts accumulate over time
-    cumulative = pivot.cumsum()
-    
-    # Add an initial row (one day before the earliest date) with zeros so animation starts at 0
-    initial_date = cumulative.index.min() - pd.Timedelta(days=1)
-    zero_row = pd.DataFrame({col: [0] for col in cumulative.columns}, index=[initial_date])
-    cumulative = pd.concat([zero_row, cumulative]).sort_index()
-    
-    # Reset index and convert the DataFrame from wide to long format
-    cumulative = cumulative.reset_index().rename(columns={"index": "Date "})
-    cumulative_long = cumulative.melt(id_vars="Date ", var_name="Day", value_name="Count")
-    
-    # Create a formatted date string for the animation frame
-    cumulative_long["Date_str"] = cumulative_long["Date "].dt.strftime("%Y-%m-%d")
+    # Cumulative orders per day of the week up to each date (starting from a zero row), in long format
+    cumulative_long = day_counts.long("Day")
     
     # Create the animated bar chart using Plotly Express with the specified day order
     fig = px.bar(
@@ -203,7 +180,7 @@ def generate_day_distribution_plot(df):
     return fig
 
 
-def generate_meal_distribution_plot(df):
+def generate_meal_distribution_plot(meal_counts):
     # meal_counts = df['Meal'].value_counts().reset_index()
     # meal_counts.columns = ['Meal', 'Count']  # Rename columns
 
@@ -228,26 +205,8 @@ def generate_meal_distribution_plot(df):
 
     # def generate_animated_meal_distribution_plot(df):
     # Ensure "Date " is datetime and sort the data
-        df["Date "] = pd.to_datetime(df["Date "])
-        df_sorted = df.sort_values("Date ")
-        
-        # Group by Date and Meal, then count orders
-        pivot = df_sorted.groupby(["Date ", "Meal"]).size().unstack(fill_value=0)
-        
-        # Compute cumulative sum along the date axis so counts accumulate over time
-        cumulative = pivot.cumsum()
-        
-        # Add an initial row (one day before the earliest date) with zeros
-        initial_date = cumulative.index.min() - pd.Timedelta(days=1)
-        zero_row = pd.DataFrame({col: [0] for col in cumulative.columns}, index=[initial_date])
-        cumulative = pd.concat([zero_row, cumulative]).sort_index()
-        
-        # Reset index and convert from wide to long format
-        cumulative = cumulative.reset_index().rename(columns={"index": "Date "})
-        cumulative_long = cumulative.melt(id_vars="Date ", var_name="Meal", value_name="Count")
-        
-        # Create a formatted date string for the animation frame
-        cumulative_long["Date_str"] = cumulative_long["Date "].dt.strftime("%Y-%m-%d")
+        # Cumulative orders per meal up to each date (starting from a zero row), in long format
+        cumulative_long = meal_counts.long("Meal")
         
         # Create the animated bar chart using Plotly Express
         fig = px.bar(
@@ -284,15 +243,22 @@ def generate_meal_distribution_plot(df):
 
 
 
-def generate_box_plot_price(df):
-    fig = px.box(
-        df,
-        y='Price',
-        title='Box Plot of Price',
-        labels={'Price': 'Price'}
-    )
+def generate_box_plot_price(sketch):
+    # Quartiles and whiskers come from the store's price sketch; only the outliers are drawn as points
+    (q1, median, q3, lowerfence, upperfence), outliers = sketch.box_stats()
+    fig = go.Figure()
+    fig.add_trace(go.Box(
+        x=["Price"], q1=[q1], median=[median], q3=[q3], lowerfence=[lowerfence], upperfence=[upperfence],
+        name="Price", marker_color="#636EFA", boxpoints=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=["Price"] * len(outliers), y=outliers, mode="markers", name="Price", marker_color="#636EFA", showlegend=False
+    ))
     
     fig.update_layout(
+        title='Box Plot of Price',
+        yaxis_title='Price',
+        showlegend=False,
         plot_bgcolor="rgba(0,0,0,0)",
         paper_bgcolor="rgba(0,0,0,0)"
     )
@@ -300,35 +266,14 @@ def generate_box_plot_price(df):
     return fig
 
 
-def generate_day_timeslot_heatmap_px(df):
-    # Ensure 'Time' is datetime
-    df["Time"] = pd.to_datetime(df["Time"])
-    
-    # Extract the hour and create 3-hour bins
-    df["Hour"] = df["Time"].dt.hour
-    df["TimeSlot"] = pd.cut(
-        df["Hour"],
-        bins=range(0, 25, 3),
-        right=False,
-        labels=[
-            '00:00-02:59', '03:00-05:59', '06:00-08:59', '09:00-11:59',
-            '12:00-14:59', '15:00-17:59', '18:00-20:59', '21:00-23:59'
-        ]
-    )
-    
-    # Ensure 'Day' is ordered correctly
-    days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    df["Day"] = pd.Categorical(df["Day"], categories=days_order, ordered=True)
-    
-    # Group by Day and TimeSlot, count orders, and unstack to create a pivot table
-    heatmap_data = df.groupby(["Day", "TimeSlot"]).size().unstack(fill_value=0)
-    heatmap_data = heatmap_data.reindex(days_order)  # Ensure correct day order
+def generate_day_timeslot_heatmap_px(heatmap_data, slot_name="3 hours"):
+    # heatmap_data: orders per day (in week order) and time slot, binned by the store
 
     # Create the heatmap using Plotly Express' imshow
     fig = px.imshow(
         heatmap_data,
         labels={
-            "x": "Time Slots (3-hour intervals)",
+            "x": f"Time Slots ({slot_name})",
             "y": "Day of the Week",
             "color": "Order Count"
         },
@@ -347,14 +292,14 @@ def generate_day_timeslot_heatmap_px(df):
 
 
 
-def generate_cdf_plot(df):
-    sorted_prices = np.sort(df["Price"])
-    cumulative_percentage = np.arange(1, len(sorted_prices) + 1) / len(sorted_prices) * 100
+def generate_cdf_plot(prices, counts):
+    # The line through every order, with at most two points per distinct price
+    sorted_prices, cumulative_fraction = ecdf_points(prices, counts)
 
     fig = go.Figure()
     fig.add_trace(go.Scatter(
         x=sorted_prices, 
-        y=cumulative_percentage,
+        y=cumulative_fraction * 100,
         mode="lines",
         line=dict(color="blue", width=2),
         name="Cumulative %"
@@ -371,13 +316,9 @@ def generate_cdf_plot(df):
 
     return fig
 
-def generate_meal_popularity_heatmap(df):
-    # Ensure 'Day' is a categorical variable with the correct order
-    days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    df['Day'] = pd.Categorical(df['Day'], categories=days_order, ordered=True)
-    
-    # Group by 'Meal' and 'Day' to calculate order frequency and pivot the result
-    heatmap_data_freq = df.groupby(['Meal', 'Day']).size().unstack(fill_value=0)
+def generate_meal_popularity_heatmap(cube):
+    # Orders per meal and day (in week order), rolled up from the order cube
+    heatmap_data_freq = cube.table('Meal', 'Day')
     
     # Create a heatmap using Plotly Express' imshow
     fig = px.imshow(
@@ -400,16 +341,13 @@ def generate_meal_popularity_heatmap(df):
     return fig
 
 
-def generate_monthly_order_histogram(df):
-    # Ensure the date column is datetime. Adjust the column name as needed.
-    df["Date "] = pd.to_datetime(df["Date "])
-    
-    # Create a 'Month' column (as string in "YYYY-MM" format)
-    df["Month"] = df["Date "].dt.to_period("M").astype(str)
-    
-    # Group by Month and count the number of orders
-    monthly_counts = df["Month"].value_counts().sort_index().reset_index()
-    monthly_counts.columns = ["Month", "Order Frequency"]
+def generate_monthly_order_histogram(cube):
+    # Orders per month, rolled up from the order cube (months without orders are not in it)
+    counts = cube.rollup(["Month"])
+    monthly_counts = pd.DataFrame({
+        "Month": counts.index,
+        "Order Frequency": counts.to_numpy()
+    })
     
     # Create the bar chart (histogram) using Plotly Express
     fig = px.bar(
@@ -545,9 +483,18 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Dynamic Counters
-total_orders = 142
-total_spent = 33228
+# Load data: the in-memory store, or its SQLite copy with ORDERS_BACKEND=sqlite
+store = open_store("./both.csv")
+prices, price_counts = store.price_counts()  # distinct prices and the orders at each
+
+# Dynamic Counters, from the store's per-day running totals
+total_orders, total_spent = store.date_totals().totals()
+
+# The NumPy work behind the charts below starts on the shared pool now and runs during the counter animations
+cube = prepare(store.cube)  # order counts, spend and quantities per Platform/Day/Meal/TimeSlot/Month/City
+day_counts = prepare(store.cumulative_counts, "Day")
+meal_counts = prepare(store.cumulative_counts, "Meal")
+price_curves = prepare(price_distribution, prices, PRICE_BIN, counts=price_counts)
 
 orders_placeholder = st.empty()
 spent_placeholder = st.empty()
@@ -613,8 +560,6 @@ st.markdown(
 )
 
 st.markdown("<br><br>", unsafe_allow_html=True)
-# Load data
-df = preprocess_data("./both.csv")  # Replace with your actual CSV file
 
 # Count occurrences of each platform
 # platform_counts = df['Platform'].value_counts()
@@ -649,7 +594,7 @@ col1, col2 = st.columns([1.5, 1])
             
 
 with col1:
-    st.plotly_chart(generate_payment_pie_chart(df), use_container_width=True)
+    st.plotly_chart(generate_payment_pie_chart(store.value_counts("Mode of Payment")), use_container_width=True)
 
 
 with col2:
@@ -693,7 +638,7 @@ with col_content:
             
 
         # with col1:
-            st.plotly_chart(generate_scatter_plot(df), use_container_width=True)
+            st.plotly_chart(generate_scatter_plot(store.order_prices()), use_container_width=True)
             st.markdown(
                 """
                 <div style=" padding: 15px; background-color: #f8f9fa; border-radius: 10px; border-right: 5px solid #FF4B4B; height: 100%;">
@@ -712,7 +657,7 @@ with col_content:
        
 
         # with col2:
-            st.plotly_chart(generate_cdf_plot(df), use_container_width=True)
+            st.plotly_chart(generate_cdf_plot(prices, price_counts), use_container_width=True)
             st.markdown(
                """
                 <div style=" padding: 15px; background-color: #f8f9fa; border-radius: 10px; border-right: 5px solid #FF4B4B; height: 100%;">
@@ -725,11 +670,11 @@ with col_content:
 
     elif st.session_state["slide"] == 4:  # Adjust the slide number as needed
        
-            st.plotly_chart(generate_price_histogram(df), use_container_width=True)
+            st.plotly_chart(generate_price_histogram(price_curves.result(), PRICE_BIN), use_container_width=True)
 
         
     elif st.session_state['slide'] == 2:
-        st.plotly_chart(generate_box_plot_price(df), use_container_width=True)
+        st.plotly_chart(generate_box_plot_price(store.summary.price_sketch), use_container_width=True)
 
         st.markdown(
     """
@@ -753,7 +698,7 @@ with col_content:
 st.markdown("<br><br>", unsafe_allow_html=True)
 
 
-st.plotly_chart(generate_monthly_order_histogram(df), use_container_width=True)
+st.plotly_chart(generate_monthly_order_histogram(cube.result()), use_container_width=True)
 
 st.markdown(
     """
@@ -795,7 +740,7 @@ with col_content:
         # col1, col2 = st.columns([1.5, 1])
 
         # with col1:
-        st.plotly_chart(generate_day_distribution_plot(df), use_container_width=True)
+        st.plotly_chart(generate_day_distribution_plot(day_counts.result()), use_container_width=True)
 
         # with col2:
         st.markdown(
@@ -816,7 +761,7 @@ with col_content:
         # col1, col2 = st.columns([1.5, 1])
 
         # with col1:
-        st.plotly_chart(generate_meal_distribution_plot(df), use_container_width=True)
+        st.plotly_chart(generate_meal_distribution_plot(meal_counts.result()), use_container_width=True)
 
         # with col2:
         st.markdown(
@@ -833,9 +778,11 @@ with col_content:
             )
         
     elif st.session_state['slide_food'] == 4:
-        st.plotly_chart(generate_day_timeslot_heatmap_px(df), use_container_width=True)
+        slot_name = st.radio("Time slot size", list(TIME_SLOTS), index=len(TIME_SLOTS) - 1, horizontal=True)
+        heatmap_data = store.day_time_counts(TIME_SLOTS[slot_name])
+        st.plotly_chart(generate_day_timeslot_heatmap_px(heatmap_data, slot_name), use_container_width=True)
         
     elif st.session_state['slide_food'] == 3:
-        st.plotly_chart(generate_meal_popularity_heatmap(df), use_container_width=True)
+        st.plotly_chart(generate_meal_popularity_heatmap(cube.result()), use_container_width=True)
 
 
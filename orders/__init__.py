@@ -0,0 +1,3 @@
+from orders.store import BOTH_CSV, OrderStore, load_database, load_orders, load_store, open_store
+
+__all__ = ["BOTH_CSV", "OrderStore", "load_database", "load_orders", "load_store", "open_store"]
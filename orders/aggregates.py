@@ -0,0 +1,188 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from orders.cleaning import DAYS
+from orders.cuisines import CuisineIndex
+from orders.dictionary import Dictionary
+from orders.heavy_hitters import SpaceSaving
+from orders.items import item_columns
+from orders.sketch import PriceSketch, sketch_by
+
+
+PRICE_BIN = 20       # same bin width as the price histograms on the pages
+SLOT_HOURS = 3       # same time slots as the day/time heatmap
+SCATTER_POINTS = 20_000  # orders the scatter plots draw at most; longer histories are thinned evenly
+
+
+def slot_labels(minutes=SLOT_HOURS * 60):
+    """'HH:MM-HH:MM' label of each `minutes` long time slot of the day."""
+    if minutes <= 0 or (24 * 60) % minutes:
+        raise ValueError(f"time slots must divide the day evenly, not {minutes!r} minutes")
+    return [
+        f"{start // 60:02d}:{start % 60:02d}-{(start + minutes - 1) // 60:02d}:{(start + minutes - 1) % 60:02d}"
+        for start in range(0, 24 * 60, minutes)
+    ]
+
+
+class OrderSummary:
+    """Running totals over orders, updated one batch at a time.
+
+    `add` costs time proportional to the batch, so the totals can follow a
+    growing order history without recomputing from the first order.
+    `top_restaurants`, `top_foods` and `top_cuisines` track the most
+    ordered names in constant memory, and `price_sketch` and
+    `price_sketches` are mergeable quantile sketches of the prices: per
+    Platform, and per Restaurant and Cuisine for the names the trackers
+    hold. With `exact`, `restaurants`, `foods` and `cuisines` also count
+    every name exactly, in memory that grows with the number of names.
+    """
+
+    SKETCHED = ('Platform', 'Restaurant', 'Cuisine')
+
+    COUNTERS = ('platforms', 'meals', 'dates')
+
+    NAME_COUNTERS = ('restaurants', 'foods', 'cuisines')
+
+    def __init__(self, exact=False):
+        self.exact = exact
+        self.orders = 0
+        self.spent = 0
+        self.rejected = 0
+        self.slot_counts = np.zeros((len(DAYS), 24 // SLOT_HOURS), dtype=np.int64)  # day x time slot
+        self.price_counts = np.zeros(0, dtype=np.int64)                           # bins of PRICE_BIN
+        self.platforms = Counter()
+        self.meals = Counter()
+        self.restaurants = Counter() if exact else None
+        self.foods = Counter() if exact else None
+        self.cuisines = Counter() if exact else None
+        self.dates = Counter()
+        self.price_sketch = PriceSketch()
+        self.price_sketches = {dimension: {} for dimension in self.SKETCHED}
+        self.top_restaurants = SpaceSaving()
+        self.top_foods = SpaceSaving()
+        self.top_cuisines = SpaceSaving()
+        self._cumulative = None
+
+    @classmethod
+    def from_orders(cls, orders, exact=False):
+        summary = cls(exact)
+        summary.add(orders)
+        return summary
+
+    def add(self, orders):
+        """Fold a batch of cleaned orders into the totals."""
+        prices = orders['Price'].to_numpy()
+        self.orders += len(orders)
+        self.spent += int(prices.sum())
+
+        days = pd.Categorical(orders['Day'], categories=DAYS).codes.astype(np.int64)
+        slots = orders['Hour'].to_numpy() // SLOT_HOURS
+        known = days >= 0
+        cells = days[known] * self.slot_counts.shape[1] + slots[known]
+        self.slot_counts += np.bincount(cells, minlength=self.slot_counts.size).reshape(self.slot_counts.shape)
+
+        price_bins = np.bincount(prices // PRICE_BIN)
+        if len(price_bins) > len(self.price_counts):
+            self.price_counts = np.pad(self.price_counts, (0, len(price_bins) - len(self.price_counts)))
+        self.price_counts[:len(price_bins)] += price_bins
+
+        self.platforms.update(_counts(orders['Platform']))
+        self.meals.update(_counts(orders['Meal']))
+        self.dates.update(_counts(orders['Date ']))
+
+        restaurants = _counts(orders['Restaurant'])
+        foods = Counter()
+        for column, _ in item_columns(orders.columns):
+            foods.update(_counts(orders[column]))
+        foods.pop('None', None)
+        # Each distinct Type is split once, by the cuisine index of the batch
+        cuisines = CuisineIndex.build(orders['Type'].astype('category'), Dictionary())
+        cuisine_counts = cuisines.counts()
+        cuisine_counts = cuisine_counts[cuisine_counts > 0].to_dict()
+        for counter, tracker, batch in [
+            (self.restaurants, self.top_restaurants, restaurants),
+            (self.foods, self.top_foods, foods),
+            (self.cuisines, self.top_cuisines, cuisine_counts),
+        ]:
+            tracker.update(batch)
+            if self.exact:
+                counter.update(batch)
+
+        # Each batch is sketched on its own and merged into the running sketches
+        self.price_sketch.update(PriceSketch.from_values(prices))
+        groups = {
+            'Platform': (pd.Categorical(orders['Platform']), prices),
+            'Restaurant': (pd.Categorical(orders['Restaurant']), prices),
+            'Cuisine': (cuisines.cuisines(), prices[cuisines.rows()]),
+        }
+        trackers = {'Restaurant': self.top_restaurants, 'Cuisine': self.top_cuisines}
+        for dimension, (values, group_prices) in groups.items():
+            sketches = self.price_sketches[dimension]
+            for name, sketch in sketch_by(values.codes, values.categories, group_prices).items():
+                if name in sketches:
+                    sketches[name].update(sketch)
+                else:
+                    sketches[name] = sketch
+            if dimension in trackers:
+                # Only names the tracker still holds keep a sketch, so there are at most `capacity` of them
+                held = trackers[dimension].counts
+                for name in [name for name in sketches if name not in held]:
+                    del sketches[name]
+        self._cumulative = None
+
+    @property
+    def day_counts(self):
+        return pd.Series(self.slot_counts.sum(axis=1), index=DAYS, name='Count')
+
+    def cumulative_date_counts(self):
+        """Orders placed up to and including each order date."""
+        if self._cumulative is None:
+            counts = pd.Series(self.dates, dtype=np.int64).sort_index()
+            self._cumulative = counts.cumsum().rename('Count')
+        return self._cumulative
+
+    def price_histogram(self):
+        """Price bin start -> order count, for the non-empty bins."""
+        starts = np.arange(len(self.price_counts)) * PRICE_BIN
+        nonzero = self.price_counts > 0
+        return pd.Series(self.price_counts[nonzero], index=starts[nonzero], name='Count')
+
+    def day_slot_table(self):
+        return pd.DataFrame(self.slot_counts, index=DAYS, columns=slot_labels())
+
+    def differences(self, other):
+        """Names of the totals that disagree with `other`; empty when both summarize the same orders."""
+        different = [name for name in ('orders', 'spent') if getattr(self, name) != getattr(other, name)]
+        if not np.array_equal(self.slot_counts, other.slot_counts):
+            different.append('slot_counts')
+        if not np.array_equal(np.trim_zeros(self.price_counts, 'b'), np.trim_zeros(other.price_counts, 'b')):
+            different.append('price_counts')
+        different += [name for name in self.COUNTERS if getattr(self, name) != getattr(other, name)]
+        if self.exact and other.exact:
+            different += [name for name in self.NAME_COUNTERS if getattr(self, name) != getattr(other, name)]
+        # Trackers and the sketches of their names only depend on the batching once a tracker
+        # has filled up; until then they must agree
+        trackers = {'Restaurant': 'top_restaurants', 'Cuisine': 'top_cuisines', None: 'top_foods'}
+        compared = ['Platform']
+        for dimension, name in trackers.items():
+            ours, theirs = getattr(self, name), getattr(other, name)
+            if len(ours.counts) < ours.capacity and len(theirs.counts) < theirs.capacity:
+                if ours.counts != theirs.counts:
+                    different.append(name)
+                if dimension is not None:
+                    compared.append(dimension)
+        # Sketches depend on how the prices were batched; only the number of prices must agree
+        sketch_counts = [
+            {dimension: {name: s.count for name, s in summary.price_sketches[dimension].items()} for dimension in compared}
+            for summary in (self, other)
+        ]
+        if self.price_sketch.count != other.price_sketch.count or sketch_counts[0] != sketch_counts[1]:
+            different.append('price_sketches')
+        return different
+
+
+def _counts(values):
+    counts = values.value_counts()
+    return counts[counts > 0].to_dict()
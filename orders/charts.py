@@ -0,0 +1,35 @@
+"""Chart inputs prepared on a shared worker pool while the page script runs on.
+
+Only work that spends its time outside the interpreter is worth moving to
+the pool: word-cloud layout and rasterizing, KDEs, bootstrap resampling
+and the store's NumPy aggregates release the GIL for most of their run.
+Plotly figures are pure Python, so pages still build and draw them on the
+script thread, once the inputs they need are ready. A page starts its
+preparation before its counter animations, so the work runs during their
+sleeps rather than after them.
+
+The pool is shared by every session of the app.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def executor():
+    """The worker pool shared by every page."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='charts')
+    return _executor
+
+
+def prepare(build, *args, **kwargs):
+    """Start `build(*args, **kwargs)` on the pool; the page reads `.result()` when it draws the chart."""
+    return executor().submit(build, *args, **kwargs)
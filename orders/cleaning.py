@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+from orders.items import NO_FOOD, item_columns
+
+
+# Bump whenever cleaning or the stored layout changes so stale snapshots are rebuilt
+SCHEMA_VERSION = 7
+
+# Besides these, every FoodN column of the items is categorical too (see category_columns)
+CATEGORY_COLUMNS = [
+    'Platform', 'Day', 'Meal', 'Restaurant', 'City', 'Type', 'Mode of Payment',
+]
+
+# Misspelled names and their canonical spelling, per column
+ALIASES = {
+    'Restaurant': {
+        'The pancake co': 'The Pancake co',
+        "L Pino'z": 'La Pinoz',
+        "La Pinozo": 'La Pinoz',
+        "The Good Bowl": 'Good Bowl',
+        "The Nomads Cafe": 'Nomads Cafe',
+    },
+}
+
+# Misspelled foods, for every FoodN column
+FOOD_ALIASES = {'Manchurian': 'Manchuria'}
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+PLATFORMS = ['Swiggy', 'Zomato']
+
+MEALS = ['Breakfast', 'Lunch', 'Snack', 'Dinner', 'Midnight Snack', 'Miscellenous']
+
+# Categorical columns every order must fill in, besides the first item's food
+REQUIRED_COLUMNS = ['Restaurant', 'City', 'Type', 'Mode of Payment']
+
+# Columns that must hold whole, non-negative numbers, besides every QuantityN column
+NUMBER_COLUMNS = ['Price']
+
+# Columns that identify an order in every export, wherever its row ends up
+ORDER_KEY = ['Platform', 'Day', 'Time', 'Restaurant', 'Price']
+
+DATE_FORMAT = '%m/%d/%y'
+TIME_FORMAT = '%H:%M'
+
+
+def category_columns(columns):
+    """The categorical columns among `columns`: CATEGORY_COLUMNS and the food of every item slot."""
+    return CATEGORY_COLUMNS + [food for food, _ in item_columns(columns)]
+
+
+def number_columns(columns):
+    """The columns among `columns` that must hold whole, non-negative numbers."""
+    return NUMBER_COLUMNS + [quantity for _, quantity in item_columns(columns)]
+
+
+def apply_aliases(df, aliases=ALIASES):
+    """Rename misspelled categories in place of rewriting every matching cell.
+
+    Aliases are resolved on each column's distinct values; rows only have
+    their integer codes remapped, so the cost grows with the number of
+    distinct names rather than with the number of orders.
+    """
+    for column, mapping in aliases.items():
+        values = df[column].astype('category')
+        categories = values.cat.categories
+        if not categories.isin(list(mapping)).any():
+            continue
+
+        renamed = categories.map(lambda name: mapping.get(name, name))
+        merged = renamed.unique().sort_values()
+        # Old code -> new code; the trailing -1 keeps missing values (code -1) missing
+        remap = np.append(merged.get_indexer(renamed), -1)
+        df[column] = pd.Categorical.from_codes(remap[values.cat.codes.to_numpy()], categories=merged)
+
+    return df
+
+
+def order_keys(df):
+    return pd.MultiIndex.from_frame(df[ORDER_KEY].astype(str))
+
+
+def apply_corrections(df, corrections):
+    """Overwrite fields of the orders listed in `corrections`.
+
+    `corrections` has the ORDER_KEY columns followed by the columns to
+    overwrite. Orders are matched with one hash join on their key, so a
+    correction keeps applying when rows are inserted or reordered.
+    """
+    if corrections is None or corrections.empty:
+        return df
+
+    corrections = corrections.drop_duplicates(ORDER_KEY, keep='last')
+    positions = order_keys(corrections).get_indexer(order_keys(df))
+    matched = positions >= 0
+    if not matched.any():
+        return df
+
+    for column in corrections.columns.difference(ORDER_KEY):
+        values = corrections[column].to_numpy()[positions[matched]]
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].cat.add_categories(pd.Index(values).difference(df[column].cat.categories))
+        df.loc[matched, column] = values
+
+    return df
+
+
+def clean_orders(df, corrections=None):
+    """Clean raw orders; return the clean orders and a report of rejected rows.
+
+    Every check runs on whole columns: dates and times are parsed with their
+    explicit formats, numbers must be whole and non-negative, the name
+    columns and the first item's food must be filled in, every food needs
+    its quantity, and Platform, Day and Meal must be known names. Rows
+    failing any check are left out of the orders and listed in the report
+    with a Reason naming every failed check.
+    """
+    slots = item_columns(df.columns)
+    # A missing item after the first is the string 'None' with quantity 0; a food without a quantity is rejected
+    for food, quantity in slots[1:]:
+        no_food = df[food].isna()
+        df[food] = df[food].fillna(NO_FOOD)
+        df[quantity] = df[quantity].mask(no_food & df[quantity].isna(), 0)
+
+    # Typed columns: small integers and categoricals instead of Python objects
+    for column in category_columns(df.columns):
+        df[column] = df[column].astype('category')
+    aliases = {**ALIASES, **{food: FOOD_ALIASES for food, _ in slots}}
+    df = apply_corrections(apply_aliases(df, aliases), corrections)
+
+    dates = pd.to_datetime(df['Date '], format=DATE_FORMAT, errors='coerce')
+    times = pd.to_datetime(df['Time'], format=TIME_FORMAT, errors='coerce')
+    numbers = {column: pd.to_numeric(df[column], errors='coerce') for column in number_columns(df.columns)}
+    # An empty quantity is reported as missing rather than as a bad number
+    missing_quantities = {quantity: df[quantity].isna().to_numpy() for _, quantity in slots}
+
+    # One boolean column per check, True where the row fails it
+    checks = {
+        f"Date is not {DATE_FORMAT}": dates.isna().to_numpy(),
+        f"Time is not {TIME_FORMAT}": times.isna().to_numpy(),
+        **{
+            f"{column} is not a non-negative whole number":
+                ~((values >= 0) & (values % 1 == 0)).to_numpy() & ~missing_quantities.get(column, np.False_)
+            for column, values in numbers.items()
+        },
+        "Unknown Platform": ~df['Platform'].isin(PLATFORMS).to_numpy(),
+        "Unknown Day": ~df['Day'].isin(DAYS).to_numpy(),
+        "Unknown Meal": ~df['Meal'].isin(MEALS).to_numpy(),
+        **{
+            f"{column} is missing": df[column].isna().to_numpy()
+            for column in REQUIRED_COLUMNS + [food for food, _ in slots[:1]]
+        },
+        **{f"{quantity} is missing": missing for quantity, missing in missing_quantities.items()},
+    }
+    failed = np.column_stack(list(checks.values()))
+    bad = failed.any(axis=1)
+    # Reasons are only spelled out for the (few) rejected rows
+    names = np.array(list(checks))
+    rejected = df[bad].assign(Reason=['; '.join(names[row]) for row in failed[bad]])
+    rejected.index.name = 'Row'
+
+    df = df.loc[~bad].assign(**{
+        'Date ': dates[~bad],
+        'Hour': times[~bad].dt.hour.astype('int16'),
+        'Minute': times[~bad].dt.minute.astype('int16'),
+        'Price': numbers['Price'][~bad].astype('int32'),
+        **{quantity: numbers[quantity][~bad].astype('int16') for _, quantity in slots},
+    })
+
+    return df.reset_index(drop=True), rejected
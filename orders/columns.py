@@ -0,0 +1,83 @@
+"""Flat numeric columns of the orders, persisted as .npy files and memory-mapped.
+
+Every process serving the app maps the same files read-only, so the
+operating system keeps one copy of the arrays in its page cache instead of
+one per process. Rows are in the store's order, so a platform's rows are
+the same slice as in the frame.
+"""
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from orders.cleaning import SCHEMA_VERSION
+
+
+NumericColumns = namedtuple('NumericColumns', ['timestamp', 'minute_of_day', 'price'])
+
+DTYPES = NumericColumns(timestamp=np.int64, minute_of_day=np.int16, price=np.int32)
+
+
+def columns_dir(csv_path, version):
+    # One directory per dataset version: readers never see a half-replaced set of files
+    stem = os.path.splitext(csv_path)[0]
+    return os.path.join(f"{stem}.columns", f"{SCHEMA_VERSION}-{version[:16]}")
+
+
+def numeric_columns(orders):
+    """Epoch seconds of each order, its minute of the day and its price."""
+    minute_of_day = orders['Hour'].to_numpy(np.int16) * 60 + orders['Minute'].to_numpy(np.int16)
+    placed = orders['Date '] + pd.to_timedelta(minute_of_day, unit='min')
+    return NumericColumns(
+        timestamp=placed.to_numpy('datetime64[s]').astype(DTYPES.timestamp),
+        minute_of_day=minute_of_day.astype(DTYPES.minute_of_day),
+        price=orders['Price'].to_numpy(DTYPES.price),
+    )
+
+
+def _schema_version(entry):
+    # Schema version a directory was written with, or None for anything else
+    schema, _, _ = entry.partition('-')
+    return int(schema) if schema.isdigit() and not entry.endswith('.tmp') else None
+
+
+def write_columns(orders, csv_path, version):
+    path = columns_dir(csv_path, version)
+    parent, directory = os.path.split(path)
+    os.makedirs(parent, exist_ok=True)
+    # A fresh directory per writer, so concurrent writers never share one
+    tmp_path = tempfile.mkdtemp(prefix=f"{directory}.", suffix='.tmp', dir=parent)
+    os.chmod(tmp_path, 0o755)  # mkdtemp makes it private; other processes map these files too
+    for name, values in numeric_columns(orders)._asdict().items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:  # another process got there first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    # Columns written by an older schema are read by no one running this code; other
+    # dataset versions of this schema may still be served by other processes
+    for entry in os.listdir(parent):
+        schema = _schema_version(entry)
+        if schema is not None and schema < SCHEMA_VERSION:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+    return path
+
+
+def load_columns(orders, csv_path, version):
+    """Memory-map the numeric columns of `orders`, writing them first if needed."""
+    path = columns_dir(csv_path, version)
+    try:
+        if not os.path.isdir(path):
+            write_columns(orders, csv_path, version)
+    except OSError:  # read-only checkout: keep the arrays in this process
+        return numeric_columns(orders)
+    try:
+        return NumericColumns(*(
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in NumericColumns._fields
+        ))
+    except FileNotFoundError:  # removed since it was found, e.g. by a newer schema's sweep
+        return numeric_columns(orders)
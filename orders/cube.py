@@ -0,0 +1,126 @@
+"""Pre-aggregated order counts, spend and quantities over the chart dimensions.
+
+The cube keeps one cell per combination of dimension values that has at
+least one order, with the number of orders, the money spent and the
+quantity ordered in it. Charts then roll the cube up to the one or two
+dimensions they plot, which only touches the non-empty cells.
+"""
+import numpy as np
+import pandas as pd
+
+
+MEASURES = ('count', 'spent', 'quantity')
+
+
+class OrderCube:
+    """Measures per combination of dimension values.
+
+    `labels` maps each dimension to its values, `cells` holds the codes of
+    the non-empty cells (one column per dimension) and `measures` the
+    count, spent and quantity of each cell.
+    """
+
+    def __init__(self, labels, cells, measures):
+        self.labels = labels
+        self.cells = cells
+        self.measures = measures
+
+    @property
+    def dimensions(self):
+        return tuple(self.labels)
+
+    @property
+    def shape(self):
+        return tuple(len(values) for values in self.labels.values())
+
+    @classmethod
+    def build(cls, codes, labels, price, quantity, count=None):
+        """Aggregate rows given the code of each row in every dimension of `labels`.
+
+        Rows with a missing value (code -1) in any dimension are left out.
+        Each row is one order unless `count` gives the orders it stands
+        for, as for rows already grouped by a database.
+        """
+        dimensions = list(labels)
+        shape = tuple(len(labels[dimension]) for dimension in dimensions)
+        known = np.logical_and.reduce([codes[dimension] >= 0 for dimension in dimensions])
+        combined = np.ravel_multi_index([codes[dimension][known] for dimension in dimensions], shape)
+        cells, inverse = np.unique(combined, return_inverse=True)
+
+        measures = {
+            'count': np.bincount(inverse, minlength=len(cells)) if count is None
+                     else np.bincount(inverse, weights=count[known], minlength=len(cells)).astype(np.int64),
+            'spent': np.bincount(inverse, weights=price[known], minlength=len(cells)).astype(np.int64),
+            'quantity': np.bincount(inverse, weights=quantity[known], minlength=len(cells)).astype(np.int64),
+        }
+        coordinates = np.stack(np.unravel_index(cells, shape), axis=1).astype(np.int32)
+        return cls(dict(labels), coordinates, measures)
+
+    def merge(self, other, sort=()):
+        """A cube of the orders of both cubes, e.g. the cube so far and one of newly appended orders.
+
+        Labels only in `other` are added after this cube's labels; the
+        labels of the dimensions in `sort` (months, say) are kept sorted.
+        """
+        labels, columns = {}, []
+        for column, dimension in enumerate(self.dimensions):
+            ours, theirs = self.labels[dimension], other.labels[dimension]
+            merged = ours.append(theirs.difference(ours, sort=False))
+            if dimension in sort:
+                merged = merged.sort_values()
+            labels[dimension] = merged
+            columns.append((merged.get_indexer(ours)[self.cells[:, column]],
+                            merged.get_indexer(theirs)[other.cells[:, column]]))
+
+        shape = tuple(len(values) for values in labels.values())
+        combined = np.concatenate([
+            np.ravel_multi_index([ours for ours, _ in columns], shape),
+            np.ravel_multi_index([theirs for _, theirs in columns], shape),
+        ])
+        cells, inverse = np.unique(combined, return_inverse=True)
+        measures = {
+            name: np.bincount(inverse, weights=np.concatenate([values, other.measures[name]]),
+                              minlength=len(cells)).astype(np.int64)
+            for name, values in self.measures.items()
+        }
+        coordinates = np.stack(np.unravel_index(cells, shape), axis=1).astype(np.int32)
+        return OrderCube(labels, coordinates, measures)
+
+    def slice(self, **where):
+        """The cells whose value in each given dimension is the given label (or one of the given labels)."""
+        keep = np.ones(len(self.cells), dtype=bool)
+        for dimension, values in where.items():
+            column = self.dimensions.index(dimension)
+            values = [values] if np.isscalar(values) else values
+            keep &= np.isin(self.cells[:, column], self.labels[dimension].get_indexer(values))
+        return OrderCube(self.labels, self.cells[keep], {name: m[keep] for name, m in self.measures.items()})
+
+    def rollup(self, dimensions, measure='count'):
+        """Total `measure` per combination of `dimensions`, every label included.
+
+        Returns a Series indexed by the labels (a MultiIndex for several
+        dimensions), or a number when `dimensions` is empty.
+        """
+        dimensions = list(dimensions)
+        values = self.measures[measure]
+        if not dimensions:
+            return int(values.sum())
+
+        columns = [self.dimensions.index(dimension) for dimension in dimensions]
+        shape = tuple(len(self.labels[dimension]) for dimension in dimensions)
+        combined = np.ravel_multi_index(tuple(self.cells[:, columns].T), shape)
+        totals = np.bincount(combined, weights=values, minlength=int(np.prod(shape))).astype(np.int64)
+        if len(dimensions) == 1:
+            index = self.labels[dimensions[0]].rename(dimensions[0])
+        else:
+            index = pd.MultiIndex.from_product([self.labels[dimension] for dimension in dimensions], names=dimensions)
+        return pd.Series(totals, index=index, name=measure)
+
+    def table(self, rows, columns, measure='count'):
+        """Two-dimensional roll-up: one row per label of `rows`, one column per label of `columns`."""
+        totals = self.rollup([rows, columns], measure).to_numpy()
+        return pd.DataFrame(
+            totals.reshape(len(self.labels[rows]), len(self.labels[columns])),
+            index=self.labels[rows].rename(rows),
+            columns=self.labels[columns].rename(columns),
+        )
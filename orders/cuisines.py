@@ -0,0 +1,59 @@
+"""Order -> cuisine index for the multi-valued Type column.
+
+Type holds comma-separated cuisines ("Italian,American"). The index stores
+them in compressed sparse row form: the cuisines of the order at row i are
+`codes[offsets[i]:offsets[i + 1]]`, as global ids of the Cuisine
+dictionary. Only the distinct Type values are ever split.
+"""
+import numpy as np
+import pandas as pd
+
+
+
+def split_cuisines(type_value):
+    return [cuisine.strip() for cuisine in str(type_value).split(',')]
+
+
+class CuisineIndex:
+
+    def __init__(self, offsets, codes, labels):
+        self.offsets = offsets
+        self.codes = codes
+        self.labels = labels
+
+    @classmethod
+    def build(cls, types, dictionary):
+        """Index a dictionary-encoded Type column."""
+        per_type = [split_cuisines(value) for value in types.cat.categories]
+        names = list(dict.fromkeys(name for cuisines in per_type for name in cuisines))
+        ids = dict(zip(names, dictionary.encode('Cuisine', names)))
+
+        # Cuisines of every distinct Type, flattened, with where each Type's run starts;
+        # the trailing zero-length entry is for orders with no Type (code -1)
+        type_lengths = np.array([len(cuisines) for cuisines in per_type] + [0], dtype=np.int64)
+        type_starts = np.concatenate([[0], np.cumsum(type_lengths)[:-1]]).astype(np.int64)
+        type_cuisines = np.array([ids[name] for cuisines in per_type for name in cuisines], dtype=np.int32)
+
+        type_codes = types.cat.codes.to_numpy()
+        lengths = type_lengths[type_codes]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        within = np.arange(offsets[-1]) - np.repeat(offsets[:-1], lengths)
+        codes = type_cuisines[np.repeat(type_starts[type_codes], lengths) + within]
+        return cls(offsets, codes, dictionary.labels('Cuisine'))
+
+    def rows(self):
+        """Row position of the order behind each (order, cuisine) pair."""
+        return np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+
+    def cuisines(self):
+        return pd.Categorical.from_codes(self.codes, categories=self.labels)
+
+    def explode(self, orders, columns):
+        """One row per (order, cuisine) with the given order columns and a Cuisine column."""
+        exploded = orders[columns].iloc[self.rows()].reset_index(drop=True)
+        exploded['Cuisine'] = self.cuisines()
+        return exploded
+
+    def counts(self):
+        counts = np.bincount(self.codes, minlength=len(self.labels))
+        return pd.Series(counts, index=self.labels, name='Count')
@@ -0,0 +1,508 @@
+"""Optional SQLite copy of an order file, for histories too large to keep in memory.
+
+The database is built from the CSV in chunks, like the streaming
+summaries, with the foods and cuisines of each order in tables of their
+own and the OrderSummary of the file stored alongside. Charts then ask it
+for the counts and sums they plot, grouped by the database over covering
+indexes; only the aggregated rows come back into pandas, so their size
+depends on the distinct dates, names and prices rather than the number
+of orders. Set ORDERS_BACKEND=sqlite to have the pages read it instead
+of the in-memory store::
+
+    python -m orders.database both.csv
+"""
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from orders.aggregates import SCATTER_POINTS, SLOT_HOURS, OrderSummary, slot_labels
+from orders.cleaning import DAYS, SCHEMA_VERSION, clean_orders
+from orders.cube import OrderCube
+from orders.cuisines import CuisineIndex
+from orders.dictionary import Dictionary, sort_labels
+from orders.items import NO_FOOD, item_columns
+from orders.platforms import platform_stats
+from orders.ranges import DateTotals
+from orders.resampling import compare_price_counts
+from orders.streaming import CHUNK_SIZE
+from orders.timeline import CumulativeCounts
+
+
+LAYOUT_VERSION = 2  # bump when the tables, indexes or meta entries change
+
+# Frame column -> database column; only these can be grouped or filtered on
+COLUMNS = {
+    'Platform': 'platform',
+    'Date ': 'date',
+    'Day': 'day',
+    'Meal': 'meal',
+    'Restaurant': 'restaurant',
+    'City': 'city',
+    'Type': 'type',
+    'Mode of Payment': 'payment',
+    'Hour': 'hour',
+    'Cuisine': 'cuisine',  # from the cuisines table: an order counts once per cuisine
+    'Food': 'food',        # from the items table: an order counts once per line item
+}
+
+SCHEMA = """
+CREATE TABLE orders (
+    row INTEGER PRIMARY KEY,  -- position among the cleaned orders, as the store's index
+    platform TEXT NOT NULL,
+    date TEXT NOT NULL,
+    month TEXT NOT NULL,       -- 'YYYY-MM' of the date, for the cube
+    day TEXT,
+    hour INTEGER NOT NULL,
+    minute INTEGER NOT NULL,
+    meal TEXT,
+    restaurant TEXT,
+    city TEXT,
+    type TEXT,
+    payment TEXT,
+    price INTEGER NOT NULL,
+    quantity INTEGER NOT NULL  -- total over the order's line items
+);
+CREATE TABLE items (
+    order_row INTEGER NOT NULL REFERENCES orders(row),
+    date TEXT NOT NULL,        -- the order's, so per-day food counts need no join
+    food TEXT NOT NULL,
+    quantity INTEGER NOT NULL
+);
+CREATE TABLE cuisines (
+    order_row INTEGER NOT NULL REFERENCES orders(row),
+    cuisine TEXT NOT NULL
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value NOT NULL);
+"""
+
+# Created after loading, which is faster than maintaining them row by row. Each chart
+# query groups in the order of one index holding every column it reads, so it scans
+# that index alone and needs no sort
+INDEXES = """
+CREATE INDEX orders_date_platform ON orders(date, platform, price, type);
+CREATE INDEX orders_date_day ON orders(date, day);
+CREATE INDEX orders_date_meal ON orders(date, meal);
+CREATE INDEX orders_date_restaurant ON orders(date, restaurant);
+CREATE INDEX orders_date_type ON orders(date, type);
+CREATE INDEX orders_platform_price ON orders(platform, price, day, meal);
+CREATE INDEX orders_day_time ON orders(day, hour, minute);
+CREATE INDEX orders_cube ON orders(platform, day, meal, hour, month, city, type, price, quantity);
+CREATE INDEX orders_platform_date ON orders(platform, date);
+CREATE INDEX orders_restaurant ON orders(restaurant);
+CREATE INDEX orders_meal ON orders(meal);
+CREATE INDEX orders_price ON orders(price);
+CREATE INDEX items_date_food ON items(date, food);
+CREATE INDEX items_order ON items(order_row);
+CREATE INDEX cuisines_order ON cuisines(order_row);
+CREATE INDEX cuisines_cuisine ON cuisines(cuisine);
+"""
+
+# The columns of the cube, as grouped by the orders_cube index
+CUBE_COLUMNS = ('platform', 'day', 'meal', 'hour', 'month', 'city')
+
+
+def database_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.sqlite'
+
+
+def _held(orders, food):
+    return (orders[food].notna() & (orders[food] != NO_FOOD)).to_numpy()
+
+
+def _order_rows(orders):
+    quantities = np.zeros(len(orders), dtype=np.int64)
+    for food, quantity in item_columns(orders.columns):
+        held = _held(orders, food)
+        quantities[held] += orders[quantity].to_numpy()[held].astype(np.int64)
+    return zip(
+        orders.index.tolist(),
+        orders['Platform'].astype(str),
+        orders['Date '].dt.strftime('%Y-%m-%d'),
+        orders['Date '].dt.strftime('%Y-%m'),
+        orders['Day'].astype(str),
+        orders['Hour'].astype(int),
+        orders['Minute'].astype(int),
+        orders['Meal'].astype(str),
+        orders['Restaurant'].astype(str),
+        orders['City'].astype(str),
+        orders['Type'].astype(str),
+        orders['Mode of Payment'].astype(str),
+        orders['Price'].astype(int),
+        quantities.tolist(),
+    )
+
+
+def _item_rows(orders):
+    dates = orders['Date '].dt.strftime('%Y-%m-%d')
+    for food, quantity in item_columns(orders.columns):
+        held = _held(orders, food)
+        yield from zip(
+            orders.index[held].tolist(),
+            dates[held],
+            orders[food][held].astype(str),
+            orders[quantity][held].astype(int),
+        )
+
+
+def _split_types(types):
+    # Split by the same CuisineIndex as the store; only the distinct Type values are split
+    return CuisineIndex.build(pd.Series(types, dtype='category'), Dictionary())
+
+
+def _cuisine_rows(orders):
+    index = _split_types(orders['Type'])
+    return zip(orders.index[index.rows()].tolist(), index.labels[index.codes])
+
+
+def build_database(csv_path, version, chunk_size=CHUNK_SIZE, corrections=None):
+    """Write the cleaned orders of `csv_path` to its SQLite file, `chunk_size` rows at a time."""
+    path = database_path(csv_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.executescript(SCHEMA)
+        # Summarized while the chunks are read, as summarize_csv does, so reading it back costs no pass
+        summary = OrderSummary()
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            orders, dropped = clean_orders(chunk, corrections)
+            # Numbered across chunks, as the store numbers the cleaned orders of the whole file
+            orders.index = pd.RangeIndex(summary.orders, summary.orders + len(orders))
+            connection.executemany(f"INSERT INTO orders VALUES ({', '.join('?' * 14)})", _order_rows(orders))
+            connection.executemany("INSERT INTO items VALUES (?, ?, ?, ?)", _item_rows(orders))
+            connection.executemany("INSERT INTO cuisines VALUES (?, ?)", _cuisine_rows(orders))
+            summary.add(orders)
+            summary.rejected += len(dropped)
+        connection.executescript(INDEXES)
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('source_version', version),
+            ('schema_version', str(SCHEMA_VERSION)),
+            ('layout_version', str(LAYOUT_VERSION)),
+            ('rejected', str(summary.rejected)),
+            ('summary', pickle.dumps(summary)),
+        ])
+        connection.commit()
+    finally:
+        connection.close()
+    # Rename into place so readers never open a half-built database
+    os.replace(tmp_path, path)
+    return path
+
+
+def _where(where, start, end):
+    clauses, params = [], []
+    for column, value in (where or {}).items():
+        clauses.append(f"{COLUMNS[column]} = ?")
+        params.append(value)
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+    if end is not None:
+        clauses.append("date <= ?")
+        params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _source(columns, where):
+    # The orders, joined to their cuisines or foods when either is grouped or filtered on
+    used = {*columns, *(where or {})}
+    source = "orders"
+    if 'Cuisine' in used:
+        source += " JOIN cuisines ON cuisines.order_row = orders.row"
+    if 'Food' in used:
+        source += " JOIN items ON items.order_row = orders.row"
+    return source
+
+
+def _codes(values, labels=None):
+    # Codes of each value and the labels they index, sorted unless given
+    if labels is None:
+        codes, labels = pd.factorize(values, sort=True)
+        return codes, pd.Index(labels)
+    return pd.Categorical(values, categories=labels).codes, pd.Index(labels)
+
+
+def _cuisine_codes(rows):
+    # Grouped rows once per cuisine of their 'type': row positions, cuisine codes and sorted cuisine labels
+    index = _split_types(rows['type'])
+    codes, labels = sort_labels(index.codes, index.labels)
+    return index.rows(), codes, labels
+
+
+class OrderDatabase:
+    """Read-only aggregate queries over the SQLite copy of one order file.
+
+    Grouping and filtering use the frame's column names ('Platform',
+    'Date ', 'Meal', 'Cuisine', ...); `where` maps columns to the value
+    they must equal and `start`/`end` bound the order date, both inclusive.
+
+    It also answers the chart queries of OrderStore (cumulative_counts,
+    cube, date_totals, ...) with the same results, so the pages can read
+    either; each is computed from grouped rows and cached. None of them
+    reads one row per order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()  # sqlite connections stay on the thread that opened them
+        self._derived = {}
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.connection = connection
+        return connection
+
+    def meta(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def _aggregate(self, expression, name, columns, where, start, end):
+        names = [COLUMNS[column] for column in columns]
+        clause, params = _where(where, start, end)
+        group = f" GROUP BY {', '.join(names)} ORDER BY {', '.join(names)}" if names else ""
+        select = ', '.join([*names, f"{expression} AS value"])
+        result = self.query(f"SELECT {select} FROM {_source(columns, where)}{clause}{group}", params)
+        result.columns = [*columns, name]
+        if not columns:
+            return int(result[name].iloc[0])
+        if 'Date ' in columns:
+            result['Date '] = pd.to_datetime(result['Date '])
+        return result.set_index(list(columns))[name]
+
+    def count_by(self, columns=(), where=None, start=None, end=None):
+        """Number of orders per combination of `columns`, or in all when there are none."""
+        return self._aggregate("COUNT(*)", 'Count', columns, where, start, end)
+
+    def sum_by(self, columns=(), where=None, start=None, end=None):
+        """Money spent per combination of `columns`, or in all when there are none."""
+        return self._aggregate("COALESCE(SUM(price), 0)", 'Price', columns, where, start, end)
+
+    def totals(self, where=None, start=None, end=None):
+        """(orders, money spent) over the matching orders."""
+        clause, params = _where(where, start, end)
+        count, spent = self.connection.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(price), 0) FROM {_source((), where)}{clause}", params).fetchone()
+        return count, spent
+
+    def food_counts(self, where=None, start=None, end=None):
+        """Line items per food, most frequent first, ties by name."""
+        clause, params = _where(where, start, end)
+        source = "items JOIN orders ON orders.row = items.order_row" if clause else "items"
+        return self.query(
+            f"SELECT food, COUNT(*) AS Count FROM {source}{clause} GROUP BY food ORDER BY Count DESC, food", params,
+        ).set_index('food').rename_axis(None)['Count']
+
+    def value_counts(self, column):
+        """Orders per value of `column`, most frequent first, ties by name."""
+        return self.count_by([column]).rename_axis(None).rename('Count').sort_values(ascending=False, kind='stable')
+
+    def _cached(self, key, build):
+        # load_database opens a new OrderDatabase for each dataset version, so nothing here goes stale
+        if key not in self._derived:
+            self._derived[key] = build()
+        return self._derived[key]
+
+    @property
+    def summary(self):
+        """OrderSummary of the source file, written when the database was built."""
+        return self._cached('summary', lambda: pickle.loads(self.meta('summary')))
+
+    def _dates(self):
+        # Every order date, ascending, as the store's timelines have them
+        return self._cached('dates', lambda: pd.to_datetime(
+            self.query("SELECT DISTINCT date FROM orders ORDER BY date")['date']).to_numpy('datetime64[D]'))
+
+    def cumulative_counts(self, dimension):
+        """CumulativeCounts of 'Day', 'Meal', 'Restaurant', 'Cuisine' or 'Food', from per-day counts."""
+        def build():
+            if dimension == 'Food':
+                rows = self.query("SELECT date, food AS value, COUNT(*) AS orders FROM items GROUP BY date, food")
+            else:
+                column = 'type' if dimension == 'Cuisine' else COLUMNS[dimension]
+                rows = self.query(
+                    f"SELECT date, {column} AS value, COUNT(*) AS orders FROM orders GROUP BY date, {column}")
+            dates = self._dates()
+            date_codes = np.searchsorted(dates, pd.to_datetime(rows['date']).to_numpy('datetime64[D]'))
+            count = rows['orders'].to_numpy()
+            if dimension == 'Cuisine':
+                positions, codes, labels = _cuisine_codes(rows.rename(columns={'value': 'type'}))
+                date_codes, count = date_codes[positions], count[positions]
+            else:
+                codes, labels = _codes(rows['value'], DAYS if dimension == 'Day' else None)
+            return CumulativeCounts.build(date_codes, dates, codes, labels, keep_unused=dimension == 'Day',
+                                          count=count)
+        return self._cached(('timeline', dimension), build)
+
+    def cube(self, cuisines=False):
+        """OrderCube over Platform, Day, Meal, TimeSlot, Month and City, from grouped rows.
+
+        With `cuisines`, the cube also has a Cuisine dimension and an order
+        counts once for each of its cuisines: the orders are grouped by
+        their Type as well, and each group's Type split into cuisines.
+        """
+        def build():
+            columns = [*CUBE_COLUMNS, *(['type'] if cuisines else [])]
+            rows = self.query(
+                f"SELECT {', '.join(f'{column} AS d{i}' for i, column in enumerate(columns))},"
+                " COUNT(*) AS count, SUM(price) AS spent, SUM(quantity) AS quantity"
+                f" FROM orders GROUP BY {', '.join(columns)}"
+            )
+            codes, labels = {}, {}
+            for i, dimension in enumerate(['Platform', 'Day', 'Meal', 'TimeSlot', 'Month', 'City']):
+                values = rows[f'd{i}']
+                if dimension == 'TimeSlot':
+                    codes[dimension], labels[dimension] = values.to_numpy() // SLOT_HOURS, pd.Index(slot_labels())
+                else:
+                    codes[dimension], labels[dimension] = _codes(values, DAYS if dimension == 'Day' else None)
+            measures = rows[['count', 'spent', 'quantity']].to_numpy()
+            if cuisines:
+                positions, codes['Cuisine'], labels['Cuisine'] = _cuisine_codes(rows.rename(columns={'d6': 'type'}))
+                codes = {dimension: values if dimension == 'Cuisine' else values[positions]
+                         for dimension, values in codes.items()}
+                measures = measures[positions]
+            count, spent, quantity = measures.T
+            return OrderCube.build(codes, labels, spent, quantity, count=count)
+        return self._cached(('cube', cuisines), build)
+
+    def date_totals(self):
+        """DateTotals of the orders, from the orders and spend per date and platform."""
+        def build():
+            rows = self.query(
+                "SELECT date, platform, COUNT(*) AS orders, SUM(price) AS spent FROM orders GROUP BY date, platform")
+            platform_codes, platforms = _codes(rows['platform'])
+            return DateTotals.build(pd.to_datetime(rows['date']).to_numpy('datetime64[D]'), platform_codes,
+                                    platforms, rows['spent'].to_numpy(), counts=rows['orders'].to_numpy())
+        return self._cached('date_totals', build)
+
+    def day_time_counts(self, slot_minutes=SLOT_HOURS * 60):
+        """Orders per day of the week (rows, in week order) and `slot_minutes` long time slot."""
+        def build():
+            labels = slot_labels(slot_minutes)
+            rows = self.query(
+                "SELECT day, hour, minute, COUNT(*) AS orders FROM orders GROUP BY day, hour, minute")
+            days = pd.Categorical(rows['day'], categories=DAYS).codes.astype(np.int64)
+            slots = (rows['hour'].to_numpy() * 60 + rows['minute'].to_numpy()) // slot_minutes
+            known = days >= 0
+            counts = np.bincount(days[known] * len(labels) + slots[known], weights=rows['orders'].to_numpy()[known],
+                                 minlength=len(DAYS) * len(labels))
+            return pd.DataFrame(
+                counts.astype(np.int64).reshape(len(DAYS), len(labels)),
+                index=pd.Index(DAYS, name='Day'),
+                columns=pd.Index(labels, name='TimeSlot'),
+            )
+        return self._cached(('day_time', slot_minutes), build)
+
+    def platform_stats(self):
+        """PlatformStats of each platform, from the orders per platform, price, day and meal."""
+        def build():
+            rows = self.query(
+                "SELECT platform, price, day, meal, COUNT(*) AS orders FROM orders GROUP BY platform, price, day, meal")
+            platform_codes, platforms = _codes(rows['platform'])
+            day_codes, days = _codes(rows['day'], DAYS)
+            meal_codes, meals = _codes(rows['meal'])
+            return platform_stats(platform_codes, platforms, rows['price'].to_numpy(), day_codes, days,
+                                  meal_codes, meals, count=rows['orders'].to_numpy())
+        return self._cached('platform_stats', build)
+
+    def price_differences(self, first='Zomato', second='Swiggy'):
+        """Bootstrap intervals and permutation tests of the median and mean price of `first` minus `second`."""
+        def build():
+            stats = self.platform_stats()
+            empty = np.zeros(0, dtype=np.int64)
+            samples = [(stats[name].prices, stats[name].counts) if name in stats else (empty, empty)
+                       for name in (first, second)]
+            return compare_price_counts(*samples[0], *samples[1])
+        return self._cached(('price_differences', first, second), build)
+
+    def price_counts(self):
+        """Distinct prices of all orders, ascending, and the orders at each."""
+        def build():
+            rows = self.query("SELECT price, COUNT(*) AS orders FROM orders GROUP BY price ORDER BY price")
+            return rows['price'].to_numpy(), rows['orders'].to_numpy()
+        return self._cached('price_counts', build)
+
+    def cuisine_prices(self):
+        """Orders per 'Date ', Platform, Cuisine and Price, for the cumulative cuisine box plots.
+
+        An order counts once for each of its cuisines; Platform and Cuisine
+        are categoricals with sorted labels.
+        """
+        def build():
+            rows = self.query(
+                "SELECT date, platform, price, type, COUNT(*) AS orders FROM orders GROUP BY date, platform, price, type")
+            positions, codes, labels = _cuisine_codes(rows)
+            prices = pd.DataFrame({
+                'Date ': pd.to_datetime(rows['date'].to_numpy()[positions]),
+                'Platform': pd.Categorical(rows['platform'].to_numpy()[positions]),
+                'Cuisine': pd.Categorical.from_codes(codes, categories=labels),
+                'Price': rows['price'].to_numpy()[positions],
+                'Count': rows['orders'].to_numpy()[positions],
+            })
+            return prices.groupby(['Date ', 'Platform', 'Cuisine', 'Price'], observed=True, as_index=False)['Count'].sum()
+        return self._cached('cuisine_prices', build)
+
+    def order_prices(self, max_points=SCATTER_POINTS):
+        """Platform and Price of the orders by row number, for the scatter plots.
+
+        Histories longer than `max_points` orders are thinned to every
+        k-th order, so the plots stay small however long they grow.
+        """
+        def build():
+            (orders,) = self.connection.execute("SELECT COUNT(*) FROM orders").fetchone()
+            # Rows are numbered 0, 1, 2, ... so every k-th order is every k-th row
+            step = max(1, -(-orders // max_points))
+            prices = self.query(
+                "SELECT row, platform AS Platform, price AS Price FROM orders WHERE row % ? = 0 ORDER BY row", (step,))
+            prices['Platform'] = pd.Categorical(prices['Platform'])
+            return prices.set_index('row').rename_axis(None)
+        return self._cached(('order_prices', max_points), build)
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def open_database(csv_path, version, corrections=None):
+    """OrderDatabase for `csv_path`, rebuilding the file when it was built from other data."""
+    path = database_path(csv_path)
+    if os.path.exists(path):
+        database = OrderDatabase(path)
+        try:
+            current = ((database.meta('source_version'), database.meta('schema_version'), database.meta('layout_version'))
+                       == (version, str(SCHEMA_VERSION), str(LAYOUT_VERSION)))
+        except sqlite3.DatabaseError:
+            current = False
+        database.close()
+        if current:
+            return database
+    build_database(csv_path, version, corrections=corrections)
+    return OrderDatabase(path)
+
+
+def main(argv):
+    from orders.store import load_database
+
+    for csv_path in argv or ['both.csv']:
+        database = load_database(csv_path)
+        orders, spent = database.totals()
+        print(f"{database.path}: {orders} orders, Rs {spent} spent, {database.meta('rejected')} rejected")
+        print(database.count_by(['Platform']).to_dict())
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
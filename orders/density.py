@@ -0,0 +1,96 @@
+"""Price histograms and kernel density curves computed on the server.
+
+The density is a Gaussian KDE evaluated on an even grid. The values are
+first spread over the grid points (linear binning), then convolved with
+the kernel through an FFT, so the cost is O(n + g log g) for n values and
+g grid points, and only the g points of the curve go to the browser.
+"""
+import numpy as np
+
+
+GRID_POINTS = 500  # same resolution as plotly's distplot curve
+
+
+def _weights(values, counts):
+    return np.ones(len(values)) if counts is None else np.asarray(counts, dtype=np.float64)
+
+
+def scott_bandwidth(values, counts=None):
+    # The bandwidth scipy.stats.gaussian_kde uses by default, each value counted `counts` times
+    weights = _weights(values, counts)
+    n = weights.sum()
+    mean = weights @ values / n
+    return np.sqrt(weights @ (values - mean) ** 2 / (n - 1)) * n ** (-1 / 5)
+
+
+def binned_kde(values, grid, bandwidth=None, counts=None):
+    """Gaussian KDE of `values` at the points of `grid`, an evenly spaced array.
+
+    `counts` gives how many times each value occurs, e.g. for the distinct
+    prices of a database's price histogram; by default each occurs once.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weights = _weights(values, counts)
+    n_grid = len(grid)
+    if weights.sum() < 2 or n_grid < 2:
+        return np.zeros(n_grid)
+    if bandwidth is None:
+        bandwidth = scott_bandwidth(values, counts)
+    if not bandwidth > 0:
+        return np.zeros(n_grid)
+
+    # Linear binning: each value is shared between its two neighbouring grid points
+    step = grid[1] - grid[0]
+    position = np.clip((values - grid[0]) / step, 0, n_grid - 1)
+    left = np.minimum(position.astype(np.int64), n_grid - 2)
+    right_weight = position - left
+    binned = (np.bincount(left, weights=weights * (1 - right_weight), minlength=n_grid)
+              + np.bincount(left + 1, weights=weights * right_weight, minlength=n_grid))
+
+    # Kernel out to 4 bandwidths (or the whole grid), convolved via FFT
+    reach = min(n_grid - 1, int(np.ceil(4 * bandwidth / step)))
+    offsets = np.arange(-reach, reach + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = 1 << int(np.ceil(np.log2(n_grid + 2 * reach)))
+    smoothed = np.fft.irfft(np.fft.rfft(binned, size) * np.fft.rfft(kernel, size), size)
+    return np.maximum(smoothed[reach:reach + n_grid], 0) / weights.sum()
+
+
+def density_histogram(values, start, bin_size, counts=None):
+    """Left edges and probability densities of `bin_size` wide bins starting at `start`."""
+    values = np.asarray(values)
+    weights = _weights(values, counts)
+    bins = ((values - start) // bin_size).astype(np.int64)
+    binned = np.bincount(bins[bins >= 0], weights=weights[bins >= 0])
+    return start + np.arange(len(binned)) * bin_size, binned / (weights.sum() * bin_size)
+
+
+def price_distribution(prices, bin_size, start=None, end=None, grid_points=GRID_POINTS, counts=None):
+    """Histogram (bin edges, densities) and KDE curve (grid, densities) of `prices`.
+
+    `start` and `end` default to the smallest and largest price; pass the
+    range of several series to draw them on the same bins and grid. With
+    `counts`, `prices` are distinct prices and `counts` the orders at each.
+    """
+    start = np.min(prices) if start is None else start
+    end = np.max(prices) if end is None else end
+    grid = np.linspace(start, end, grid_points)
+    return density_histogram(prices, start, bin_size, counts), (grid, binned_kde(prices, grid, counts=counts))
+
+
+def ecdf_points(values, counts):
+    """x and y of the ECDF line of the sorted distinct `values`, ordered `counts` times each.
+
+    A line through every order rises straight up through the orders at
+    one price; it is drawn from the first of them to the last instead, so
+    the line looks the same with at most two points per price.
+    """
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1] if len(cumulative) else 1
+    points = np.where(counts > 1, 2, 1)
+    last = np.cumsum(points) - 1
+    x = np.repeat(values, points)
+    y = np.empty(len(x))
+    y[last] = cumulative / total
+    y[last[counts > 1] - 1] = (cumulative - counts + 1)[counts > 1] / total
+    return x, y
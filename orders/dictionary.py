@@ -0,0 +1,141 @@
+"""Global dictionary encoding of the name columns.
+
+Each dimension (restaurants, foods, cities, cuisine types) maps every name
+ever seen to an integer id. Ids are only ever appended, and the mapping is
+saved next to the CSVs, so a name keeps its id across reloads and across
+files. Encoded columns are categoricals whose categories are the whole
+dictionary: a category code *is* the global id, and grouping, filtering
+and counting can work on the codes alone.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from orders.items import item_columns
+
+
+# Column -> dimension, besides the FoodN columns (see encoded_columns)
+ENCODED_COLUMNS = {
+    'Restaurant': 'Restaurant',
+    'City': 'City',
+    'Type': 'Type',
+}
+
+
+def encoded_columns(columns):
+    """Column -> dimension of the encoded columns among `columns`; every FoodN column shares the Food dictionary."""
+    return {**ENCODED_COLUMNS, **{food: 'Food' for food, _ in item_columns(columns)}}
+
+
+class Dictionary:
+    """Append-only name <-> id mapping per dimension, persisted as JSON.
+
+    One process is expected to write the file; others only read it.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._labels = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._labels = json.load(f)
+        self._ids = {
+            dimension: {name: i for i, name in enumerate(labels)}
+            for dimension, labels in self._labels.items()
+        }
+
+    def labels(self, dimension):
+        return pd.Index(self._labels.get(dimension, []), dtype=object)
+
+    def _register(self, dimension, names):
+        labels = self._labels.setdefault(dimension, [])
+        ids = self._ids.setdefault(dimension, {})
+        new = [name for name in names if name not in ids]
+        for name in new:
+            ids[name] = len(labels)
+            labels.append(name)
+        return bool(new)
+
+    def encode(self, dimension, names):
+        """Global ids of `names`, adding the ones not seen before."""
+        with self._lock:
+            if self._register(dimension, names):
+                self.save()
+            ids = self._ids[dimension]
+            return np.fromiter((ids[name] for name in names), dtype=np.int64, count=len(names))
+
+    def encode_columns(self, df, columns=None):
+        """Re-encode `columns` of `df` (by default, encoded_columns) so their category codes are global ids.
+
+        Only each column's distinct values are looked up; rows just have
+        their codes remapped.
+        """
+        if columns is None:
+            columns = encoded_columns(df.columns)
+        with self._lock:
+            values = {column: df[column].astype('category') for column in columns}
+            changed = False
+            for column, dimension in columns.items():
+                changed |= self._register(dimension, values[column].cat.categories)
+            if changed:
+                self.save()
+
+            for column, dimension in columns.items():
+                ids = self._ids[dimension]
+                local = values[column].cat.categories
+                # Local code -> global id; the trailing -1 keeps missing values missing
+                remap = np.append(np.fromiter((ids[name] for name in local), dtype=np.int64, count=len(local)), -1)
+                codes = remap[values[column].cat.codes.to_numpy()]
+                df[column] = pd.Categorical.from_codes(codes, categories=self.labels(dimension))
+        return df
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._labels, f, indent=0)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # read-only checkout: ids stay stable for the life of this process
+
+
+def count_labels(*columns, exclude=()):
+    """Occurrences of each name across encoded columns of one dimension, most frequent first.
+
+    Counting runs on the integer codes; only the labels of the non-zero
+    counts are decoded.
+    """
+    categories = max((column.cat.categories for column in columns), key=len)
+    counts = np.zeros(len(categories), dtype=np.int64)
+    for column in columns:
+        codes = column.cat.codes.to_numpy()
+        counts += np.bincount(codes[codes >= 0], minlength=len(categories))
+    for name in exclude:
+        if name in categories:
+            counts[categories.get_loc(name)] = 0
+
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0]
+    return pd.Series(counts[order], index=categories[order], name='Count')
+
+
+def sort_labels(codes, labels):
+    """`codes` re-pointed at `labels` sorted by name, and the sorted labels.
+
+    Dictionary ids follow the order names were first seen in; charts and
+    the database list labels by name instead, so both agree.
+    """
+    labels = pd.Index(labels)
+    order = labels.argsort()
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    codes = np.asarray(codes)
+    if not len(labels):
+        return codes, labels
+    return np.where(codes >= 0, rank[codes], -1).astype(codes.dtype), labels[order]
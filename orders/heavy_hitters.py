@@ -0,0 +1,100 @@
+"""Most frequently ordered names, tracked in constant memory.
+
+SpaceSaving keeps at most `capacity` counters. A name that is already
+counted has its counter increased; a new name takes over the smallest
+counter and inherits its count as a possible overcount. Every name ordered
+more than total / capacity times is guaranteed to hold a counter, and each
+count is off by at most its recorded error, however many distinct names
+the history contains.
+
+The smallest counter is found through a heap of (count, arrival, name)
+entries. Entries go stale when a count grows; they are skipped when they
+surface and the heap is rebuilt once stale entries outnumber live ones,
+so finding and replacing the smallest counter costs O(log capacity).
+"""
+import heapq
+
+
+CAPACITY = 100
+
+
+class SpaceSaving:
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self._arrivals = {}  # name -> arrival number, for ties
+        self._arrival = 0  # next arrival number; a plain int, so trackers pickle
+        self._heap = []
+
+    def _push(self, name):
+        heapq.heappush(self._heap, (self.counts[name], self._arrivals[name], name))
+        if len(self._heap) > 2 * self.capacity + 16:
+            self._heap = [(count, self._arrivals[n], n) for n, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_smallest(self):
+        while True:
+            count, arrival, name = heapq.heappop(self._heap)
+            if self.counts.get(name) == count and self._arrivals[name] == arrival:
+                return name
+
+    def _insert(self, name, count, error):
+        self.counts[name] = count
+        self.errors[name] = error
+        self._arrivals[name] = self._arrival
+        self._arrival += 1
+        self._push(name)
+
+    def update(self, counts):
+        """Count a batch, given as name -> occurrences."""
+        for name, count in counts.items():
+            self.total += count
+            if name in self.counts:
+                self.counts[name] += count
+                self._push(name)
+            elif len(self.counts) < self.capacity:
+                self._insert(name, count, 0)
+            else:
+                evicted = self._pop_smallest()
+                floor = self.counts.pop(evicted)
+                del self.errors[evicted], self._arrivals[evicted]
+                self._insert(name, floor + count, floor)
+
+    def _floor(self):
+        # What any name without a counter may have been counted, at most
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other):
+        """Fold in the counters of another tracker, e.g. one kept for another partition.
+
+        A name missing from one tracker is credited that tracker's smallest
+        count, as a possible overcount, so the error bound of both holds
+        for the merged counters.
+        """
+        floors = (self._floor(), other._floor())
+        names = list(self.counts) + [name for name in other.counts if name not in self.counts]
+        merged = {}
+        for name in names:
+            count, error = 0, 0
+            for tracker, floor in zip((self, other), floors):
+                count += tracker.counts.get(name, floor)
+                error += tracker.errors.get(name, floor)
+            merged[name] = (count, error)
+
+        kept = heapq.nlargest(self.capacity, enumerate(names), key=lambda item: (merged[item[1]][0], -item[0]))
+        total = self.total + other.total
+        self.__init__(self.capacity)
+        self.total = total
+        for _, name in sorted(kept):
+            self._insert(name, *merged[name])
+
+    def top(self, n):
+        """The `n` most frequent names and their counts, highest first; ties keep first-counted order."""
+        ranked = heapq.nlargest(n, self.counts.items(), key=lambda item: (item[1], -self._arrivals[item[0]]))
+        return [(name, count) for name, count in ranked]
+
+    def names(self, n):
+        return [name for name, _ in self.top(n)]
@@ -0,0 +1,81 @@
+"""Line items of the orders: one row per food in an order.
+
+The CSV has a fixed pair of columns per item (Food1/Quantity1,
+Food2/Quantity2, ...) and marks an unused slot with the food 'None'. The
+line items keep only the slots that hold a food, as three flat arrays:
+the row position of the order in the store's frame, the food's global id
+in the Food dictionary and the quantity. Any number of FoodN/QuantityN
+pairs is picked up.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+NO_FOOD = 'None'
+
+_FOOD_COLUMN = re.compile(r'Food(\d+)$')
+
+
+def item_columns(columns):
+    """(food column, quantity column) of every item slot, in slot order."""
+    slots = sorted(int(m.group(1)) for m in map(_FOOD_COLUMN.match, columns) if m)
+    return [(f"Food{n}", f"Quantity{n}") for n in slots if f"Quantity{n}" in columns]
+
+
+class LineItems:
+
+    def __init__(self, order_id, food_code, quantity, labels):
+        self.order_id = order_id
+        self.food_code = food_code
+        self.quantity = quantity
+        self.labels = labels
+
+    @classmethod
+    def from_orders(cls, orders):
+        """Line items of dictionary-encoded orders, grouped by order and in slot order within one."""
+        slots = item_columns(orders.columns)
+        labels = max((orders[food].cat.categories for food, _ in slots), key=len)
+        no_food = labels.get_indexer([NO_FOOD])[0]
+
+        order_ids, food_codes, quantities = [], [], []
+        for food, quantity in slots:
+            codes = orders[food].cat.codes.to_numpy()
+            held = (codes >= 0) & (codes != no_food)
+            order_ids.append(np.flatnonzero(held))
+            food_codes.append(codes[held].astype(np.int32))
+            quantities.append(orders[quantity].to_numpy()[held].astype(np.int16))
+
+        order_id = np.concatenate(order_ids)
+        order = np.argsort(order_id, kind='stable')
+        return cls(
+            order_id[order].astype(np.int32),
+            np.concatenate(food_codes)[order],
+            np.concatenate(quantities)[order],
+            labels,
+        )
+
+    def __len__(self):
+        return len(self.order_id)
+
+    def foods(self):
+        return pd.Categorical.from_codes(self.food_code, categories=self.labels)
+
+    def food_counts(self):
+        """Line items per food, most frequent first, for the foods that were ordered."""
+        counts = np.bincount(self.food_code, minlength=len(self.labels))
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] > 0]
+        return pd.Series(counts[order], index=self.labels[order], name='Count')
+
+    def order_quantities(self, n_orders):
+        """Total quantity of each of the first `n_orders` orders."""
+        return np.bincount(self.order_id, weights=self.quantity, minlength=n_orders).astype(np.int64)
+
+    def explode(self, orders, columns):
+        """One row per line item with the given order columns, a Food column and a Quantity column."""
+        exploded = orders[columns].iloc[self.order_id].reset_index(drop=True)
+        exploded['Food'] = self.foods()
+        exploded['Quantity'] = self.quantity
+        return exploded
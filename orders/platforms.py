@@ -0,0 +1,108 @@
+"""Per-platform statistics behind the Swiggy vs Zomato comparison charts.
+
+Every comparison chart reads the same bundle, built in one grouped pass
+over the orders, or over rows a database has already grouped by
+platform, price, day and meal. The rows are sorted once by platform and
+price, so each platform's prices are a contiguous slice; they are kept
+as distinct prices and the orders at each, which is all the quartiles,
+histograms, KDEs and ECDFs need. The day and meal counts of all
+platforms each come from a single bincount. The stores cache the bundle
+per dataset version.
+"""
+import numpy as np
+import pandas as pd
+
+from orders.aggregates import PRICE_BIN
+from orders.density import binned_kde, density_histogram, ecdf_points, GRID_POINTS
+from orders.quantiles import counted_box
+
+
+class PlatformStats:
+    """Prices and order counts of one platform.
+
+    `prices` are the distinct prices, sorted, and `counts[i]` the orders
+    costing `prices[i]`; `ecdf[i]` is the fraction of orders costing at
+    most `prices[i]`. `histogram` holds the left bin edges and densities,
+    `kde` the grid and density curve, both on bins and a grid shared by all
+    platforms. `box` is (q1, median, q3, lower fence, upper fence), with the
+    prices outside the fences in `outliers`, once per order. `days` and
+    `meals` count the orders per day of the week and per meal.
+    """
+
+    def __init__(self, prices, counts, histogram, kde, box, outliers, days, meals):
+        self.prices = prices
+        self.counts = counts
+        self.histogram = histogram
+        self.kde = kde
+        self.box = box
+        self.outliers = outliers
+        self.days = days
+        self.meals = meals
+
+    @property
+    def ecdf(self):
+        return np.cumsum(self.counts) / self.counts.sum()
+
+    def ecdf_points(self):
+        """x and y of the ECDF line through every order (see density.ecdf_points)."""
+        return ecdf_points(self.prices, self.counts)
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+
+def platform_stats(platform_codes, platforms, prices, day_codes, days, meal_codes, meals, count=None,
+                   bin_size=PRICE_BIN, grid_points=GRID_POINTS):
+    """PlatformStats of every platform with orders, by name.
+
+    Each row is given by its platform code, price, day code and meal code,
+    and stands for one order unless `count` gives the orders it stands
+    for. Rows with a platform code below zero are skipped, as are day and
+    meal codes below zero in their counts.
+    """
+    if count is None:
+        count = np.ones(len(prices), dtype=np.int64)
+    known = platform_codes >= 0
+    platform_codes, prices, count = platform_codes[known].astype(np.int64), prices[known], count[known]
+    day_codes, meal_codes = day_codes[known].astype(np.int64), meal_codes[known].astype(np.int64)
+    if not len(prices):
+        return {}
+
+    # One sort by (platform, price): each platform's prices are a slice, equal prices adjacent
+    order = np.lexsort((prices, platform_codes))
+    sorted_platforms, sorted_prices, sorted_counts = platform_codes[order], prices[order], count[order]
+    firsts = np.flatnonzero(np.append(True, (np.diff(sorted_platforms) != 0) | (np.diff(sorted_prices) != 0)))
+    distinct_platforms, distinct_prices = sorted_platforms[firsts], sorted_prices[firsts]
+    distinct_counts = np.add.reduceat(sorted_counts, firsts)
+    bounds = np.searchsorted(distinct_platforms, np.arange(len(platforms) + 1))
+
+    # Shared histogram bins and KDE grid over the full price range
+    start, end = distinct_prices.min(), distinct_prices.max()
+    grid = np.linspace(start, end, grid_points)
+
+    def per_platform(codes, n_labels):
+        keep = codes >= 0
+        cells = platform_codes[keep] * n_labels + codes[keep]
+        counts = np.bincount(cells, weights=count[keep], minlength=len(platforms) * n_labels)
+        return counts.astype(np.int64).reshape(len(platforms), n_labels)
+
+    day_counts = per_platform(day_codes, len(days))
+    meal_counts = per_platform(meal_codes, len(meals))
+
+    stats = {}
+    for i, name in enumerate(platforms):
+        if bounds[i] == bounds[i + 1]:
+            continue
+        values, counts = distinct_prices[bounds[i]:bounds[i + 1]], distinct_counts[bounds[i]:bounds[i + 1]]
+        box, outliers = counted_box(values, counts)
+        stats[name] = PlatformStats(
+            prices=values,
+            counts=counts,
+            histogram=density_histogram(values, start, bin_size, counts),
+            kde=(grid, binned_kde(values, grid, counts=counts)),
+            box=box,
+            outliers=outliers,
+            days=pd.Series(day_counts[i], index=pd.Index(days, name='Day'), name=name),
+            meals=pd.Series(meal_counts[i], index=pd.Index(meals, name='Meal'), name=name),
+        )
+    return stats
@@ -0,0 +1,125 @@
+"""Box-plot statistics of values that keep arriving, per group.
+
+The cumulative box plots show, for every frame, the quartiles, whiskers
+and outliers of all values seen up to that frame. Instead of re-sorting
+every earlier value for every frame, each group counts its values over
+its sorted distinct values; a frame adds its values with one bincount,
+and the statistics are a cumulative sum and a few binary searches over
+those counts. Only the frames in which a group received values have its
+statistics recomputed.
+"""
+import numpy as np
+
+
+# Columns of CumulativeBoxStats.stats, named like the go.Box attributes they feed
+BOX_FIELDS = ('q1', 'median', 'q3', 'lowerfence', 'upperfence')
+
+WHISKER_IQR = 1.5  # whiskers reach the furthest value within 1.5 IQR of the box, as in plotly
+
+
+def whisker_limits(q1, q3):
+    """Lowest and highest values the whiskers may reach; values beyond them are outliers."""
+    reach = WHISKER_IQR * (q3 - q1)
+    return q1 - reach, q3 + reach
+
+
+def whisker_box(q1, median, q3, low, high):
+    """(q1, median, q3, lower fence, upper fence) and outliers, as a box plot draws them.
+
+    `low` and `high` are the smallest and largest values known, both
+    sorted; pass the same array for both when every value is known. The
+    whiskers end at the most extreme known value inside the limits; when
+    none is, the limit stands in for it.
+    """
+    lower_limit, upper_limit = whisker_limits(q1, q3)
+    first = int(np.searchsorted(low, lower_limit, side='left'))
+    last = int(np.searchsorted(high, upper_limit, side='right'))
+    lower = low[first] if first < len(low) else lower_limit
+    upper = high[last - 1] if last else upper_limit
+    outliers = np.concatenate([low[:first], high[last:]])
+    return (q1, median, q3, min(lower, q1), max(upper, q3)), outliers
+
+
+def counted_quantiles(values, counts, probabilities):
+    """Quantiles of the sorted `values`, each occurring `counts` times.
+
+    Plotly's box-plot rule, without expanding the values into one entry
+    per occurrence: quantile p of n values sits at rank p * n - 0.5,
+    counted from zero and clamped to the first and last value, with linear
+    interpolation in between (numpy.quantile's 'hazen' method).
+    """
+    cumulative = np.cumsum(counts)
+    positions = np.clip(np.asarray(probabilities) * cumulative[-1] - 0.5, 0, cumulative[-1] - 1)
+    below = np.floor(positions)
+    low = values[np.searchsorted(cumulative, below, side='right')]
+    high = values[np.minimum(np.searchsorted(cumulative, below + 1, side='right'), len(values) - 1)]
+    return low + (high - low) * (positions - below)
+
+
+def counted_box(values, counts):
+    """(q1, median, q3, lower fence, upper fence) and outliers of the sorted `values`, each occurring `counts` times.
+
+    Values may repeat and counts may be zero; outliers are listed once
+    per occurrence, in ascending order.
+    """
+    q1, median, q3 = counted_quantiles(values, counts, [0.25, 0.5, 0.75])
+    lower_limit, upper_limit = whisker_limits(q1, q3)
+    first = int(np.searchsorted(values, lower_limit, side='left'))
+    last = int(np.searchsorted(values, upper_limit, side='right'))
+    inside = np.flatnonzero(counts[first:last]) + first
+    lower = values[inside[0]] if len(inside) else lower_limit
+    upper = values[inside[-1]] if len(inside) else upper_limit
+    outliers = np.concatenate([np.repeat(values[:first], counts[:first]), np.repeat(values[last:], counts[last:])])
+    return (float(q1), float(median), float(q3), float(min(lower, q1)), float(max(upper, q3))), outliers
+
+
+class CumulativeBoxStats:
+    """Box statistics of every group over the values seen up to each frame.
+
+    `stats[f, g]` holds the BOX_FIELDS of group g over all values of frames
+    0..f (NaN while the group is empty), `counts[f, g]` how many values
+    that is, and `outliers[f]` a (group codes, values) pair of arrays.
+    Each value is seen once unless `weights` gives how many times, as for
+    rows already grouped by a database.
+    """
+
+    def __init__(self, stats, counts, outliers):
+        self.stats = stats
+        self.counts = counts
+        self.outliers = outliers
+
+    @classmethod
+    def build(cls, frame_codes, n_frames, group_codes, n_groups, values, weights=None):
+        values = np.asarray(values)
+        weights = np.ones(len(values), dtype=np.int64) if weights is None else np.asarray(weights)
+        stats = np.full((n_frames, n_groups, len(BOX_FIELDS)), np.nan)
+        counts = np.zeros((n_frames, n_groups), dtype=np.int64)
+
+        # One sort by (group, frame): each group's values are a slice, in the order they arrive
+        order = np.lexsort((frame_codes, group_codes))
+        bounds = np.searchsorted(group_codes[order], np.arange(n_groups + 1))
+        changed, group_outliers = [], []  # per group: frames it received values in, and its outliers after each
+        for group in range(n_groups):
+            rows = order[bounds[group]:bounds[group + 1]]
+            distinct, value_codes = np.unique(values[rows], return_inverse=True)
+            group_frames, group_weights = frame_codes[rows], weights[rows]
+            frames, starts = np.unique(group_frames, return_index=True)
+            seen = np.zeros(len(distinct), dtype=np.int64)
+            outliers = []
+            for frame, start, stop in zip(frames, starts, [*starts[1:], len(rows)]):
+                seen += np.bincount(value_codes[start:stop], weights=group_weights[start:stop],
+                                    minlength=len(distinct)).astype(np.int64)
+                box, frame_outliers = counted_box(distinct, seen)
+                stats[frame:, group] = box  # until the group changes again
+                counts[frame:, group] = seen.sum()
+                outliers.append(frame_outliers)
+            changed.append(frames)
+            group_outliers.append(outliers)
+
+        frame_outliers = []
+        for frame in range(n_frames):
+            latest = [np.searchsorted(frames, frame, side='right') - 1 for frames in changed]
+            current = [outliers[i] if i >= 0 else values[:0] for outliers, i in zip(group_outliers, latest)]
+            outlier_groups = np.repeat(np.arange(n_groups), [len(o) for o in current])
+            frame_outliers.append((outlier_groups, np.concatenate(current) if current else values[:0]))
+        return cls(stats, counts, frame_outliers)
@@ -0,0 +1,104 @@
+"""Order counts and spend over date ranges, from per-day prefix sums.
+
+The orders and money spent on each order date are accumulated once, per
+platform, into running totals with a leading zero row. The total over any
+range of dates is then the difference of two rows found by binary search
+on the dates, whatever the number of orders in the range.
+"""
+import numpy as np
+import pandas as pd
+
+
+class DateTotals:
+    """Running order counts and spend per platform, by order date.
+
+    `orders[i, j]` and `spent[i, j]` are the orders and money spent on
+    platform `platforms[j]` on the dates before `dates[i]`; the last row
+    holds the totals over every date.
+    """
+
+    def __init__(self, dates, platforms, orders, spent):
+        self.dates = dates
+        self.platforms = platforms
+        self.orders = orders
+        self.spent = spent
+
+    @classmethod
+    def build(cls, dates, platform_codes, platforms, prices, counts=None):
+        """Accumulate orders given the date, platform code and price of each; codes below zero are skipped.
+
+        Each entry is one order unless `counts` gives the orders it stands
+        for, in which case `prices` are their summed prices.
+        """
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        known = (platform_codes >= 0) & ~np.isnat(dates)
+        date_codes, days = pd.factorize(dates[known], sort=True)
+        cells = date_codes.astype(np.int64) * len(platforms) + platform_codes[known]
+        shape = (len(days), len(platforms))
+
+        orders = np.zeros((len(days) + 1, len(platforms)), dtype=np.int64)
+        spent = np.zeros((len(days) + 1, len(platforms)), dtype=np.int64)
+        weights = None if counts is None else counts[known]
+        daily_orders = np.bincount(cells, weights=weights, minlength=shape[0] * shape[1])
+        np.cumsum(daily_orders.astype(np.int64).reshape(shape), axis=0, out=orders[1:])
+        daily_spent = np.bincount(cells, weights=prices[known], minlength=shape[0] * shape[1])
+        np.cumsum(daily_spent.astype(np.int64).reshape(shape), axis=0, out=spent[1:])
+        return cls(np.asarray(days, dtype='datetime64[D]'), platforms, orders, spent)
+
+    def merge(self, other):
+        """Totals over the orders of both, e.g. the totals so far and those of newly appended orders."""
+        dates = np.union1d(self.dates, other.dates)
+        platforms = self.platforms.append(other.platforms.difference(self.platforms, sort=False))
+        orders = np.zeros((len(dates) + 1, len(platforms)), dtype=np.int64)
+        spent = np.zeros((len(dates) + 1, len(platforms)), dtype=np.int64)
+        for totals in (self, other):
+            # Back to per-day values, placed at the merged dates and platforms
+            rows = np.searchsorted(dates, totals.dates) + 1
+            columns = platforms.get_indexer(totals.platforms)
+            orders[np.ix_(rows, columns)] += np.diff(totals.orders, axis=0)
+            spent[np.ix_(rows, columns)] += np.diff(totals.spent, axis=0)
+        return DateTotals(dates, platforms, np.cumsum(orders, axis=0), np.cumsum(spent, axis=0))
+
+    def _rows(self, start, end):
+        # Rows bounding the dates in [start, end]; either end may be left open
+        first = 0 if start is None else np.searchsorted(self.dates, np.datetime64(start, 'D'), side='left')
+        last = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(end, 'D'), side='right')
+        return first, max(first, last)
+
+    def _columns(self, platform):
+        if platform is None:
+            return slice(None)
+        if platform not in self.platforms:
+            return slice(0)
+        return self.platforms.get_loc(platform)
+
+    def totals(self, start=None, end=None, platform=None):
+        """(orders, money spent) from `start` to `end`, both included, on one platform or all of them."""
+        first, last = self._rows(start, end)
+        columns = self._columns(platform)
+        orders = self.orders[last, columns] - self.orders[first, columns]
+        spent = self.spent[last, columns] - self.spent[first, columns]
+        return int(np.sum(orders)), int(np.sum(spent))
+
+    def by_platform(self, start=None, end=None):
+        """Orders and money spent per platform from `start` to `end`, as a DataFrame."""
+        first, last = self._rows(start, end)
+        return pd.DataFrame(
+            {'Orders': self.orders[last] - self.orders[first], 'Spent': self.spent[last] - self.spent[first]},
+            index=self.platforms.rename('Platform'),
+        )
+
+    def per_day(self, start=None, end=None, platform=None):
+        """Average (orders, money spent) per calendar day from `start` to `end`.
+
+        Open ends default to the first and last order date.
+        """
+        if not len(self.dates):
+            return 0.0, 0.0
+        start = self.dates[0] if start is None else np.datetime64(start, 'D')
+        end = self.dates[-1] if end is None else np.datetime64(end, 'D')
+        days = int((end - start) // np.timedelta64(1, 'D')) + 1
+        if days <= 0:
+            return 0.0, 0.0
+        orders, spent = self.totals(start, end, platform)
+        return orders / days, spent / days
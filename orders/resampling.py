@@ -0,0 +1,239 @@
+"""Bootstrap and permutation tests of the price difference between two platforms.
+
+Prices repeat a lot, so each sample is reduced to its distinct prices and
+their counts. Drawing n prices with replacement is then one multinomial
+draw over the distinct prices, and shuffling the pooled prices between
+the platforms is one multivariate hypergeometric draw, so a resample
+costs time in the number of distinct prices, not orders. Samples with
+few orders per distinct price are cheaper to resample order by order,
+and are resampled that way. Resamples are drawn as rows of one matrix, in
+chunks of at most CHUNK_CELLS cells to bound memory, and every statistic
+is computed from the same draws.
+
+Once a test would draw more than EXACT_CELLS counts, the resamples are
+not drawn in full. A median only needs the prices at two ranks: in a
+bootstrap those are order statistics of uniform draws, which have Beta
+distributions, and in a permutation they are found by halving the pooled
+ranks with hypergeometric draws. Means are drawn from the normal
+distributions they take in samples that large.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+
+RESAMPLES = 2_000
+CONFIDENCE = 0.95
+CHUNK_CELLS = 1 << 22  # resamples x distinct prices held at once
+EXACT_CELLS = 1 << 19  # resamples x distinct prices above which resamples are not drawn in full
+STATISTICS = ('median', 'mean')
+FEW_ORDERS = 4  # orders per distinct price below which orders are drawn one by one
+
+Comparison = namedtuple('Comparison', ['statistic', 'difference', 'low', 'high', 'p_value'])
+
+
+def _check(statistic):
+    if statistic not in STATISTICS:
+        raise ValueError(f"statistic must be one of {STATISTICS}, not {statistic!r}")
+
+
+def _statistic(values, counts, statistic):
+    """`statistic` of each row of `counts`, the number of times each of the sorted `values` was drawn."""
+    _check(statistic)
+    n = counts.sum(axis=-1)
+    if statistic == 'mean':
+        return counts @ values / n
+    # Values at the two middle ranks, averaged as numpy.median does
+    cumulative = np.cumsum(counts, axis=-1)
+    lower = (cumulative <= ((n - 1) // 2)[..., None]).sum(axis=-1)
+    upper = (cumulative <= (n // 2)[..., None]).sum(axis=-1)
+    return (values[lower] + values[upper]) / 2
+
+
+def _merge(first_values, first_counts, second_values, second_counts):
+    """Sorted distinct prices of both samples and how often each occurs in each."""
+    values = np.union1d(first_values, second_values).astype(np.float64)
+    counts = []
+    for sample_values, sample_counts in ((first_values, first_counts), (second_values, second_counts)):
+        merged = np.zeros(len(values), dtype=np.int64)
+        merged[np.searchsorted(values, sample_values)] = sample_counts
+        counts.append(merged)
+    return values, *counts
+
+
+def _moments(values, counts):
+    """Mean and variance of the sorted `values`, each occurring `counts` times."""
+    n = counts.sum()
+    mean = counts @ values / n
+    return mean, counts @ (values - mean) ** 2 / n
+
+
+def _ranked(values, counts, ranks):
+    """Values at the 0-based `ranks` of the sorted `values`, each occurring `counts` times."""
+    return values[np.minimum(np.searchsorted(np.cumsum(counts), ranks, side='right'), len(values) - 1)]
+
+
+def _bootstrap(rng, counts, size):
+    """`size` bootstrap resamples, as counts per distinct price, of the sample with `counts`."""
+    n = int(counts.sum())
+    if n >= FEW_ORDERS * len(counts):
+        return rng.multinomial(n, counts / n, size=size)
+    codes = np.repeat(np.arange(len(counts)), counts)[rng.integers(0, n, size=(size, n))]
+    codes += np.arange(size)[:, None] * len(counts)
+    return np.bincount(codes.ravel(), minlength=size * len(counts)).reshape(size, len(counts))
+
+
+def _shuffle(rng, pooled, n, size):
+    """`size` random draws of `n` of the `pooled` prices without replacement, as counts per distinct price."""
+    method = 'count' if pooled.sum() < FEW_ORDERS * len(pooled) else 'marginals'
+    return rng.multivariate_hypergeometric(pooled, n, size=size, method=method)
+
+
+def _chunks(resamples, width):
+    size = max(1, CHUNK_CELLS // max(width, 1))
+    for start in range(0, resamples, size):
+        yield min(size, resamples - start)
+
+
+def _bootstrapped(rng, values, counts, statistics, resamples):
+    """`resamples` bootstrap draws of each of `statistics` of the sample with `counts`."""
+    # Only the sample's own prices can be drawn
+    drawn = counts > 0
+    values, counts, n = values[drawn], counts[drawn], int(counts.sum())
+    if resamples * len(values) <= EXACT_CELLS:
+        draws = {statistic: [] for statistic in statistics}
+        for size in _chunks(resamples, len(values)):
+            resampled = _bootstrap(rng, counts, size)
+            for statistic in statistics:
+                draws[statistic].append(_statistic(values, resampled, statistic))
+        return {statistic: np.concatenate(draws[statistic]) for statistic in statistics}
+
+    draws = {}
+    for statistic in statistics:
+        _check(statistic)
+        if statistic == 'mean':
+            mean, variance = _moments(values, counts)
+            draws[statistic] = rng.normal(mean, np.sqrt(variance / n), size=resamples)
+            continue
+        # The k-th smallest of n uniform draws is Beta(k, n + 1 - k); given it, the next is
+        # the smallest of n - k uniform draws above it. Prices are those quantiles of the sample.
+        rank = (n - 1) // 2 + 1
+        lower = rng.beta(rank, n + 1 - rank, size=resamples)
+        upper = lower if n % 2 else lower + (1 - lower) * rng.beta(1, n - rank, size=resamples)
+        draws[statistic] = (_ranked(values, counts, lower * n) + _ranked(values, counts, upper * n)) / 2
+    return draws
+
+
+def _split_positions(rng, total, chosen, first_ranks, second_ranks, size):
+    """Positions of order statistics of `size` random splits of `total` sorted positions.
+
+    Each split puts `chosen` positions, drawn without replacement, in its
+    first part and the rest in its second. Returns the positions holding
+    each of the 0-based `first_ranks` of the first part and `second_ranks`
+    of the second, one row per split. A split is never drawn in full: a
+    range whose number of chosen positions is known is halved, the chosen
+    positions in its left half being hypergeometric, and only the halves
+    holding a wanted rank are followed.
+    """
+    wanted = np.concatenate([first_ranks, second_ranks])
+    in_first = np.arange(len(wanted)) < len(first_ranks)
+    found = np.zeros((size, len(wanted)), dtype=np.int64)
+    # One entry per range followed: its split, bounds, chosen positions in it and before it
+    row = np.arange(size)
+    low, high = np.zeros(size, dtype=np.int64), np.full(size, total, dtype=np.int64)
+    inside, before = np.full(size, chosen, dtype=np.int64), np.zeros(size, dtype=np.int64)
+    while len(row):
+        # Rank in its part of the first position of each range, and how many of that part it holds
+        starts = np.where(in_first, before[:, None], (low - before)[:, None])
+        held = np.where(in_first, inside[:, None], (high - low - inside)[:, None])
+        holds = (starts <= wanted) & (wanted < starts + held)
+        single = high - low == 1
+        ranges, targets = np.nonzero(holds & single[:, None])
+        found[row[ranges], targets] = low[ranges]
+
+        follow = np.any(holds, axis=1) & ~single
+        row, low, high, inside, before = row[follow], low[follow], high[follow], inside[follow], before[follow]
+        middle = (low + high) // 2
+        left = rng.hypergeometric(inside, high - low - inside, middle - low)
+        row = np.concatenate([row, row])
+        low, high = np.concatenate([low, middle]), np.concatenate([middle, high])
+        inside, before = np.concatenate([left, inside - left]), np.concatenate([before, before + left])
+    return found[:, :len(first_ranks)], found[:, len(first_ranks):]
+
+
+def _permuted(rng, values, first_counts, second_counts, statistics, resamples):
+    """`resamples` draws of each statistic's difference between random splits of the pooled prices."""
+    pooled = first_counts + second_counts
+    n_first, n_second = int(first_counts.sum()), int(second_counts.sum())
+    if resamples * len(values) <= EXACT_CELLS:
+        draws = {statistic: [] for statistic in statistics}
+        for size in _chunks(resamples, len(values)):
+            # The first platform's share of the pooled prices, the rest go to the second
+            shuffled = _shuffle(rng, pooled, n_first, size)
+            for statistic in statistics:
+                draws[statistic].append(
+                    _statistic(values, shuffled, statistic) - _statistic(values, pooled - shuffled, statistic))
+        return {statistic: np.concatenate(draws[statistic]) for statistic in statistics}
+
+    draws = {}
+    total = n_first + n_second
+    for statistic in statistics:
+        _check(statistic)
+        if statistic == 'mean':
+            # The first share's sum is near normal, its variance shrunk for drawing without replacement
+            mean, variance = _moments(values, pooled)
+            spread = np.sqrt(n_first * variance * n_second / (total - 1))
+            first_sum = rng.normal(n_first * mean, spread, size=resamples)
+            draws[statistic] = first_sum / n_first - (total * mean - first_sum) / n_second
+            continue
+        # The two middle ranks of each share, averaged as numpy.median does
+        first, second = _split_positions(rng, total, n_first, [(n_first - 1) // 2, n_first // 2],
+                                         [(n_second - 1) // 2, n_second // 2], resamples)
+        draws[statistic] = (_ranked(values, pooled, first).mean(axis=1)
+                            - _ranked(values, pooled, second).mean(axis=1))
+    return draws
+
+
+def compare_prices(first, second, statistics=STATISTICS, resamples=RESAMPLES, confidence=CONFIDENCE, seed=0):
+    """Comparison of `statistic(first) - statistic(second)` for each of `statistics`.
+
+    `first` and `second` hold one price per order; see compare_price_counts.
+    """
+    first, second = np.asarray(first), np.asarray(second)
+    return compare_price_counts(*np.unique(first, return_counts=True), *np.unique(second, return_counts=True),
+                                statistics=statistics, resamples=resamples, confidence=confidence, seed=seed)
+
+
+def compare_price_counts(first_values, first_counts, second_values, second_counts, statistics=STATISTICS,
+                         resamples=RESAMPLES, confidence=CONFIDENCE, seed=0):
+    """Comparison of `statistic(first) - statistic(second)` for each of `statistics`.
+
+    Each platform is given by its sorted distinct prices and the orders
+    at each, as PlatformStats keeps them. `low` and `high` bound the
+    percentile bootstrap confidence interval at `confidence`, each
+    platform resampled on its own. `p_value` is the two-sided permutation
+    test of no difference, from `resamples` random splits of the pooled
+    prices.
+    """
+    if not np.sum(first_counts) or not np.sum(second_counts):
+        return [Comparison(statistic, np.nan, np.nan, np.nan, np.nan) for statistic in statistics]
+    rng = np.random.default_rng(seed)
+
+    # Both samples are counted over the same sorted distinct prices
+    values, first_counts, second_counts = _merge(first_values, first_counts, second_values, second_counts)
+    observed = {
+        statistic: float(_statistic(values, first_counts, statistic) - _statistic(values, second_counts, statistic))
+        for statistic in statistics
+    }
+    first_draws = _bootstrapped(rng, values, first_counts, statistics, resamples)
+    second_draws = _bootstrapped(rng, values, second_counts, statistics, resamples)
+    permuted = _permuted(rng, values, first_counts, second_counts, statistics, resamples)
+
+    comparisons = []
+    for statistic in statistics:
+        differences = first_draws[statistic] - second_draws[statistic]
+        low, high = np.quantile(differences, [(1 - confidence) / 2, (1 + confidence) / 2])
+        extreme = int(np.count_nonzero(np.abs(permuted[statistic]) >= abs(observed[statistic]) - 1e-9))
+        p_value = (extreme + 1) / (resamples + 1)
+        comparisons.append(Comparison(statistic, observed[statistic], float(low), float(high), p_value))
+    return comparisons
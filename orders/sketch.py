@@ -0,0 +1,110 @@
+"""Mergeable quantile sketches of order prices.
+
+A PriceSketch is a t-digest: prices are summarised by weighted centroids,
+small near the extremes and larger around the median, so quantiles have a
+small relative rank error while memory stays bounded by `compression`
+whatever the number of orders. Two sketches merge into one summarising
+both sets of prices, so sketches of separate batches, partitions or users
+can be combined without the prices themselves. The smallest and largest
+prices are also kept exactly, so box plots can show their outliers.
+"""
+import numpy as np
+
+from orders.quantiles import whisker_box
+
+
+COMPRESSION = 200  # at most this many centroids per sketch
+EXTREMES = 25      # exact prices kept at each end, for outliers
+
+
+class PriceSketch:
+
+    def __init__(self, means=None, weights=None, low=None, high=None, compression=COMPRESSION):
+        self.compression = compression
+        self.means = np.zeros(0) if means is None else means
+        self.weights = np.zeros(0) if weights is None else weights
+        self.low = np.zeros(0) if low is None else low      # smallest prices, ascending
+        self.high = np.zeros(0) if high is None else high   # largest prices, ascending
+
+    @classmethod
+    def from_values(cls, values, compression=COMPRESSION):
+        values = np.sort(np.asarray(values, dtype=np.float64))
+        sketch = cls(values, np.ones(len(values)), values[:EXTREMES], values[-EXTREMES:], compression)
+        sketch._compress()
+        return sketch
+
+    @property
+    def count(self):
+        return int(self.weights.sum())
+
+    def __len__(self):
+        return self.count
+
+    def add(self, values):
+        """Fold more prices into the sketch."""
+        self.update(PriceSketch.from_values(values, self.compression))
+
+    def update(self, other):
+        """Fold another sketch into this one."""
+        means = np.concatenate([self.means, other.means])
+        order = np.argsort(means, kind='stable')
+        self.means, self.weights = means[order], np.concatenate([self.weights, other.weights])[order]
+        self.low = np.sort(np.concatenate([self.low, other.low]))[:EXTREMES]
+        self.high = np.sort(np.concatenate([self.high, other.high]))[-EXTREMES:]
+        self._compress()
+
+    def merge(self, other):
+        """A new sketch of the prices of both sketches."""
+        merged = PriceSketch(self.means, self.weights, self.low, self.high, self.compression)
+        merged.update(other)
+        return merged
+
+    def _compress(self):
+        # Centroids whose left edges fall in the same unit of the k1 scale function are merged;
+        # the scale is steep near q = 0 and 1, which keeps the tails finely resolved
+        total = self.weights.sum()
+        if len(self.means) <= self.compression or total == 0:
+            return
+        left = (np.cumsum(self.weights) - self.weights) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * left - 1)
+        groups = np.floor(k - k[0]).astype(np.int64)
+        _, groups = np.unique(groups, return_inverse=True)
+        weights = np.bincount(groups, weights=self.weights)
+        self.means = np.bincount(groups, weights=self.weights * self.means) / weights
+        self.weights = weights
+
+    def quantile(self, q):
+        """Estimated price at quantile(s) `q`, interpolating between centroid centres."""
+        q = np.asarray(q, dtype=np.float64)
+        if not len(self.means):
+            return np.full(q.shape, np.nan)
+        total = self.weights.sum()
+        centres = np.cumsum(self.weights) - self.weights / 2
+        # The extremes are known exactly, so the curve is pinned to them at both ends
+        ranks = np.concatenate([[0], centres, [total]])
+        values = np.concatenate([[self.low[0]], self.means, [self.high[-1]]])
+        # Rank q * n - 0.5 counted from the first centre: exactly Plotly's box-plot
+        # quartiles while every centroid still holds a single price
+        return np.interp(q * total, ranks, values)
+
+    def box_stats(self):
+        """(q1, median, q3, lower fence, upper fence) and the known outliers, as for a box plot."""
+        # Only the kept extremes are known exactly, so only they can be outliers
+        return whisker_box(*self.quantile([0.25, 0.5, 0.75]), self.low, self.high)
+
+
+def sketch_by(codes, labels, prices):
+    """PriceSketch of the prices of each label, for the labels that have prices.
+
+    `codes` may repeat an order (one entry per cuisine of the order, say);
+    codes below zero are skipped.
+    """
+    known = codes >= 0
+    codes, prices = codes[known], prices[known]
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    return {
+        labels[i]: PriceSketch.from_values(prices[order[start:stop]])
+        for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:]))
+        if stop > start
+    }
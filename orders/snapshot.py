@@ -0,0 +1,79 @@
+"""Typed Parquet snapshot of a cleaned order file, kept next to its CSV.
+
+Build every snapshot up front with::
+
+    python -m orders.snapshot both.csv zomato.csv swiggy.csv
+
+The store also rebuilds a snapshot on its own whenever the CSV changed.
+"""
+import os
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # snapshots are an optimisation; without pyarrow the CSV is parsed
+    pa = pq = None
+
+from orders.cleaning import SCHEMA_VERSION
+
+
+VERSION_KEY = b'orders.source_version'
+SCHEMA_KEY = b'orders.schema_version'
+
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def read_snapshot(csv_path, version):
+    """Read the snapshot of `csv_path`, or return None if it is missing or stale.
+
+    The file is memory-mapped and its pages decoded into Arrow buffers;
+    numeric columns without missing values are handed to pandas as views
+    of those buffers, one block per column, rather than copied again.
+
+    A snapshot is stale when it is older than the CSV, was built from other
+    CSV content, or was written by an older version of the cleaning code.
+    """
+    path = snapshot_path(csv_path)
+    if pq is None or not os.path.exists(path):
+        return None
+    if os.stat(path).st_mtime_ns < os.stat(csv_path).st_mtime_ns:
+        return None
+
+    table = pq.read_table(path, memory_map=True)
+    metadata = table.schema.metadata or {}
+    if metadata.get(VERSION_KEY) != version.encode() or metadata.get(SCHEMA_KEY) != str(SCHEMA_VERSION).encode():
+        return None
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def write_snapshot(orders, csv_path, version):
+    if pq is None:
+        return None
+
+    path = snapshot_path(csv_path)
+    table = pa.Table.from_pandas(orders)
+    table = table.replace_schema_metadata({
+        **table.schema.metadata,
+        VERSION_KEY: version.encode(),
+        SCHEMA_KEY: str(SCHEMA_VERSION).encode(),
+    })
+    # Write beside the target and rename so readers never see a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv):
+    from orders.store import load_store
+
+    for csv_path in argv or ['both.csv']:
+        store = load_store(csv_path)
+        print(write_snapshot(store.orders, store.path, store.version))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,483 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from orders.aggregates import SCATTER_POINTS, SLOT_HOURS, OrderSummary, slot_labels
+from orders.cleaning import DAYS, category_columns, clean_orders
+from orders.columns import NumericColumns, load_columns, numeric_columns
+from orders.cube import OrderCube
+from orders.cuisines import CuisineIndex
+from orders.database import open_database
+from orders.dictionary import Dictionary, count_labels, sort_labels
+from orders.items import LineItems
+from orders.platforms import platform_stats
+from orders.resampling import compare_price_counts
+from orders.ranges import DateTotals
+from orders.snapshot import read_snapshot, write_snapshot
+from orders.timeline import CumulativeCounts
+
+
+# Every session reads the same frame. Under copy-on-write a write to a page's copy copies
+# the column first and arrays taken from it are read-only, so none reach the shared frame
+pd.set_option('mode.copy_on_write', True)
+
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOTH_CSV = os.path.join(DATA_DIR, "both.csv")
+CORRECTIONS_CSV = os.path.join(DATA_DIR, "corrections.csv")
+DICTIONARY_JSON = os.path.join(DATA_DIR, "dictionary.json")
+
+# Where the pages read orders from: 'memory' (load_store) or 'sqlite' (load_database)
+BACKENDS = ('memory', 'sqlite')
+BACKEND = os.environ.get('ORDERS_BACKEND', 'memory')
+
+_lock = threading.Lock()
+_stores = {}        # absolute path -> OrderStore
+_databases = {}     # absolute path -> (dataset_version, OrderDatabase)
+_fingerprints = {}  # absolute path -> ((mtime_ns, size), digest)
+_dictionary = None
+
+
+def fingerprint(path):
+    """Content hash of `path`, recomputed only when its mtime or size changes."""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _fingerprints.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    _fingerprints[path] = (key, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def dataset_version(path):
+    """Hash identifying the cleaned orders of `path`: the CSV plus the corrections applied to it."""
+    parts = [fingerprint(path)]
+    if os.path.exists(CORRECTIONS_CSV):
+        parts.append(fingerprint(CORRECTIONS_CSV))
+    return hashlib.sha256(':'.join(parts).encode()).hexdigest()
+
+
+def rejected_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.rejected.csv'
+
+
+def read_corrections(path=CORRECTIONS_CSV):
+    if not os.path.exists(path):
+        return None
+    # Compared as text against the order key, so keep every field a string
+    return pd.read_csv(path, dtype=str)
+
+
+def write_rejected(rejected, csv_path):
+    path = rejected_path(csv_path)
+    if len(rejected):
+        rejected.to_csv(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def dictionary():
+    """The name dictionary shared by every store of this process."""
+    global _dictionary
+    if _dictionary is None:
+        _dictionary = Dictionary(DICTIONARY_JSON)
+    return _dictionary
+
+
+def partition_by_platform(orders):
+    # Stable, so each platform keeps the file's order; the index keeps each order's row number
+    return orders.sort_values('Platform', kind='stable')
+
+
+def concat_orders(frames):
+    orders = pd.concat(frames)
+    # Batches cleaned separately have different categories; merge them instead of falling back to objects
+    for column in category_columns(orders.columns):
+        categories = [frame[column].cat.categories for frame in frames]
+        widest = max(categories, key=len)
+        if all(widest[:len(c)].equals(c) for c in categories):
+            # Dictionary-encoded: categories only grow, so every batch's codes stay valid
+            codes = np.concatenate([frame[column].cat.codes.to_numpy() for frame in frames])
+            orders[column] = pd.Categorical.from_codes(codes, categories=widest)
+        else:
+            orders[column] = union_categoricals([frame[column] for frame in frames], sort_categories=True)
+    return orders
+
+
+class OrderStore:
+    """Cleaned orders of one CSV file, shared by every session of the app.
+
+    Orders are stored grouped by Platform, so `platform(name)` is a slice
+    of the shared frame rather than a filtered copy. `version` is the
+    dataset_version of the source file and `generation` the number of
+    batches appended since it was read, so anything derived from the orders
+    can be cached against both. `rejected` lists the rows that were left
+    out while cleaning, with the reason. `summary` holds the running totals
+    over all orders, kept current by `append`.
+    """
+
+    def __init__(self, path, version, orders, rejected):
+        self.path = path
+        self.version = version
+        self.generation = 0
+        self.rejected = rejected
+        self.summary = OrderSummary.from_orders(orders)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._columns = None
+        self._derived = None
+        self._next_row = int(orders.index.max()) + 1 if len(orders) else 0
+        self._set_orders(orders)
+
+    def _set_orders(self, orders):
+        self._frame = orders
+        self._cuisines = CuisineIndex.build(orders['Type'], dictionary())
+        self._items = LineItems.from_orders(orders)
+        platforms = orders['Platform'].cat.categories
+        bounds = np.searchsorted(orders['Platform'].cat.codes.to_numpy(), np.arange(len(platforms) + 1))
+        self._partitions = {
+            name: (int(start), int(stop))
+            for name, start, stop in zip(platforms, bounds[:-1], bounds[1:])
+        }
+
+    @property
+    def _orders(self):
+        # Appended batches are merged into the frame only when someone needs the rows
+        if self._pending:
+            with self._lock:
+                if self._pending:
+                    self._set_orders(partition_by_platform(concat_orders([self._frame, *self._pending])))
+                    self._pending = []
+        return self._frame
+
+    @property
+    def orders(self):
+        # Shallow copy under copy-on-write: columns are only copied once a page writes to them
+        return self._orders.copy(deep=False)
+
+    @property
+    def partitions(self):
+        self._orders
+        return self._partitions
+
+    def platform(self, name):
+        start, stop = self.partitions.get(name, (0, 0))
+        return self._orders.iloc[start:stop].copy(deep=False)
+
+    @property
+    def cuisines(self):
+        """CuisineIndex of the orders, in the frame's row order."""
+        self._orders
+        return self._cuisines
+
+    @property
+    def items(self):
+        """LineItems of the orders; order ids are row positions in the frame."""
+        self._orders
+        return self._items
+
+    @property
+    def columns(self):
+        """Memory-mapped timestamp, minute-of-day and price arrays, in the frame's row order."""
+        columns = self._columns
+        generation = (self.version, self.generation)
+        if columns is None or columns[0] != generation:
+            if self.generation:
+                # Appended orders exist only in this process; their columns are not written to disk
+                columns = (generation, numeric_columns(self._orders))
+            else:
+                columns = (generation, load_columns(self._orders, self.path, self.version))
+            self._columns = columns
+        return columns[1]
+
+    def _cached(self, key, build):
+        # Everything derived from the orders is kept until the file or an append changes them
+        generation = (self.version, self.generation)
+        derived = self._derived
+        if derived is None or derived[0] != generation:
+            derived = (generation, {})
+            self._derived = derived
+        if key not in derived[1]:
+            derived[1][key] = build(self._orders)
+        return derived[1][key]
+
+    def cumulative_counts(self, dimension):
+        """CumulativeCounts of 'Day', 'Meal', 'Restaurant', 'Cuisine' or 'Food', cached per version."""
+        return self._cached(('timeline', dimension), lambda orders: self._build_timeline(orders, dimension))
+
+    def cube(self, cuisines=False):
+        """OrderCube over Platform, Day, Meal, TimeSlot, Month and City, cached per version.
+
+        With `cuisines`, the cube also has a Cuisine dimension and an order
+        counts once for each of its cuisines.
+        """
+        return self._cached(
+            ('cube', cuisines),
+            lambda orders: self._build_cube(orders, cuisines, self._cuisines, self._items),
+        )
+
+    def date_totals(self):
+        """DateTotals of the orders, for order counts and spend over any date range, cached per version."""
+        return self._cached('date_totals', self._build_date_totals)
+
+    def _build_date_totals(self, orders):
+        return DateTotals.build(
+            orders['Date '].to_numpy('datetime64[D]'),
+            orders['Platform'].cat.codes.to_numpy(),
+            orders['Platform'].cat.categories,
+            orders['Price'].to_numpy(),
+        )
+
+    def platform_stats(self):
+        """PlatformStats of each platform, for the comparison charts, cached per version."""
+        return self._cached('platform_stats', lambda orders: platform_stats(
+            orders['Platform'].cat.codes.to_numpy(),
+            orders['Platform'].cat.categories,
+            orders['Price'].to_numpy(),
+            pd.Categorical(orders['Day'], categories=DAYS).codes,
+            DAYS,
+            orders['Meal'].cat.codes.to_numpy(),
+            orders['Meal'].cat.categories,
+        ))
+
+    def price_differences(self, first='Zomato', second='Swiggy'):
+        """Bootstrap intervals and permutation tests of the median and mean price of `first` minus `second`."""
+        def build(orders):
+            stats = self.platform_stats()
+            empty = np.zeros(0, dtype=np.int64)
+            samples = [(stats[name].prices, stats[name].counts) if name in stats else (empty, empty)
+                       for name in (first, second)]
+            return compare_price_counts(*samples[0], *samples[1])
+        return self._cached(('price_differences', first, second), build)
+
+    def day_time_counts(self, slot_minutes=SLOT_HOURS * 60):
+        """Orders per day of the week (rows, in week order) and `slot_minutes` long time slot, cached per version."""
+        return self._cached(('day_time', slot_minutes), lambda orders: self._build_day_time(orders, slot_minutes))
+
+    def _build_day_time(self, orders, slot_minutes):
+        labels = slot_labels(slot_minutes)
+        # Integer division of the stored int16 minute of the day; the frame is left as it is
+        slots = self.columns.minute_of_day // np.int16(slot_minutes)
+        days = pd.Categorical(orders['Day'], categories=DAYS).codes.astype(np.int64)
+        known = days >= 0
+        counts = np.bincount(days[known] * len(labels) + slots[known], minlength=len(DAYS) * len(labels))
+        return pd.DataFrame(
+            counts.reshape(len(DAYS), len(labels)),
+            index=pd.Index(DAYS, name='Day'),
+            columns=pd.Index(labels, name='TimeSlot'),
+        )
+
+    def _build_cube(self, orders, cuisines, cuisine_index, items):
+        days = pd.Categorical(orders['Day'], categories=DAYS)
+        month_codes, months = pd.factorize(orders['Date '].to_numpy('datetime64[M]'), sort=True)
+        codes = {
+            'Platform': orders['Platform'].cat.codes.to_numpy(),
+            'Day': days.codes,
+            'Meal': orders['Meal'].cat.codes.to_numpy(),
+            'TimeSlot': orders['Hour'].to_numpy() // SLOT_HOURS,
+            'Month': month_codes,
+            'City': orders['City'].cat.codes.to_numpy(),
+        }
+        labels = {
+            'Platform': orders['Platform'].cat.categories,
+            'Day': pd.Index(DAYS),
+            'Meal': orders['Meal'].cat.categories,
+            'TimeSlot': pd.Index(slot_labels()),
+            'Month': pd.Index(np.datetime_as_string(months, unit='M')),
+            'City': orders['City'].cat.categories,
+        }
+        for dimension in ('Platform', 'Meal', 'City'):
+            codes[dimension], labels[dimension] = sort_labels(codes[dimension], labels[dimension])
+        price = orders['Price'].to_numpy()
+        quantity = items.order_quantities(len(orders))
+        if cuisines:
+            rows = cuisine_index.rows()
+            codes = {dimension: values[rows] for dimension, values in codes.items()}
+            codes['Cuisine'], labels['Cuisine'] = sort_labels(cuisine_index.codes, cuisine_index.labels)
+            price, quantity = price[rows], quantity[rows]
+        return OrderCube.build(codes, labels, price, quantity)
+
+    def _build_timeline(self, orders, dimension):
+        date_codes, dates = pd.factorize(orders['Date '], sort=True)
+        dates = dates.to_numpy('datetime64[D]')
+        if dimension == 'Day':
+            # Every day of the week, in week order, even before its first order
+            days = pd.Categorical(orders['Day'], categories=DAYS)
+            return CumulativeCounts.build(date_codes, dates, days.codes, pd.Index(DAYS), keep_unused=True)
+        if dimension == 'Cuisine':
+            cuisines = self._cuisines
+            date_codes, codes, labels = date_codes[cuisines.rows()], cuisines.codes, cuisines.labels
+        elif dimension == 'Food':
+            items = self._items
+            date_codes, codes, labels = date_codes[items.order_id], items.food_code, items.labels
+        else:
+            codes, labels = orders[dimension].cat.codes.to_numpy(), orders[dimension].cat.categories
+        return CumulativeCounts.build(date_codes, dates, *sort_labels(codes, labels))
+
+    def value_counts(self, column):
+        """Orders per value of `column`, most frequent first, ties by name, for the values that occur."""
+        return count_labels(self._orders[column]).sort_index().sort_values(ascending=False, kind='stable')
+
+    def food_counts(self):
+        """Line items per food, most frequent first, ties by name."""
+        return self.items.food_counts().sort_index().sort_values(ascending=False, kind='stable')
+
+    def price_counts(self):
+        """Distinct prices of all orders, ascending, and the orders at each, cached per version."""
+        return self._cached('price_counts', lambda orders: np.unique(self.columns.price, return_counts=True))
+
+    def cuisine_prices(self):
+        """Orders per 'Date ', Platform, Cuisine and Price, for the cumulative cuisine box plots, cached per version.
+
+        An order counts once for each of its cuisines; Platform and Cuisine
+        are categoricals with sorted labels.
+        """
+        def build(orders):
+            exploded = self._cuisines.explode(orders, ['Date ', 'Platform', 'Price'])
+            for column in ('Platform', 'Cuisine'):
+                codes, labels = sort_labels(exploded[column].cat.codes.to_numpy(), exploded[column].cat.categories)
+                exploded[column] = pd.Categorical.from_codes(codes, categories=labels).remove_unused_categories()
+            exploded['Count'] = 1
+            return exploded.groupby(['Date ', 'Platform', 'Cuisine', 'Price'], observed=True, as_index=False)['Count'].sum()
+        return self._cached('cuisine_prices', build)
+
+    def order_prices(self, max_points=SCATTER_POINTS):
+        """Platform and Price of the orders by row number, for the scatter plots, cached per version.
+
+        Histories longer than `max_points` orders are thinned to every
+        k-th order, so the plots stay small however long they grow.
+        """
+        def build(orders):
+            prices = orders[['Platform', 'Price']].sort_index()
+            return prices.iloc[::max(1, -(-len(prices) // max_points))]
+        return self._cached(('order_prices', max_points), build)
+
+    def platform_columns(self, name):
+        start, stop = self.partitions.get(name, (0, 0))
+        return NumericColumns(*(values[start:stop] for values in self.columns))
+
+    def append(self, rows, corrections=None):
+        """Add raw order rows (the CSV's columns), updating the totals from them alone.
+
+        The new rows are cleaned like the file was. `summary`, the cubes and
+        the date totals fold in the new orders only. The rows themselves are
+        merged into the frame the next time a page needs them, and the views
+        built from rows (indexes, timelines, columns, platform stats) are
+        rebuilt then, once per appended batch. Only the store in memory
+        changes; the CSV is left as it is. Returns the cleaned orders added.
+        """
+        if corrections is None:
+            corrections = read_corrections()
+        orders, rejected = clean_orders(rows.copy(), corrections)
+        orders = dictionary().encode_columns(orders)
+
+        with self._lock:
+            orders.index = pd.RangeIndex(self._next_row, self._next_row + len(orders))
+            self._next_row += len(orders)
+            self.summary.add(orders)
+            self.summary.rejected += len(rejected)
+            self._pending.append(orders)
+            if len(rejected):
+                self.rejected = pd.concat([self.rejected, rejected]) if len(self.rejected) else rejected
+
+            derived = self._derived
+            current = derived is not None and derived[0] == (self.version, self.generation)
+            self.generation += 1
+            views = self._update_views(derived[1], orders) if current else {}
+            self._derived = ((self.version, self.generation), views)
+        return orders
+
+    def _update_views(self, views, orders):
+        # The pre-aggregated views fold in the new orders alone; the others are dropped and rebuilt on next use
+        updated = {}
+        cuisine_index, items = None, None
+        for key, view in views.items():
+            if key == 'date_totals':
+                updated[key] = view.merge(self._build_date_totals(orders))
+            elif isinstance(key, tuple) and key[0] == 'cube':
+                if cuisine_index is None:
+                    cuisine_index = CuisineIndex.build(orders['Type'], dictionary())
+                    items = LineItems.from_orders(orders)
+                updated[key] = view.merge(self._build_cube(orders, key[1], cuisine_index, items),
+                                         sort=('Platform', 'Meal', 'Month', 'City', 'Cuisine'))
+        return updated
+
+    def check_consistency(self):
+        """Rebuild the summary from every order; return the names of the totals that drifted."""
+        return OrderSummary.from_orders(self._orders, self.summary.exact).differences(self.summary)
+
+    def __len__(self):
+        return self.summary.orders
+
+
+def load_store(path=BOTH_CSV):
+    """Return the OrderStore for `path`, re-reading it only when its dataset_version changed.
+
+    Orders appended to the store are kept until the file itself changes.
+    A fresh Parquet snapshot is preferred over parsing the CSV; a stale or
+    missing one is rebuilt from the CSV.
+    """
+    path = os.path.abspath(path)
+    with _lock:
+        version = dataset_version(path)
+        store = _stores.get(path)
+        if store is None or store.version != version:
+            orders = read_snapshot(path, version)
+            if orders is not None:
+                # Ids may have been added since the snapshot was written; this only touches distinct names
+                orders = dictionary().encode_columns(orders)
+                report = rejected_path(path)
+                rejected = pd.read_csv(report, index_col='Row') if os.path.exists(report) else orders.iloc[:0]
+            else:
+                orders, rejected = clean_orders(pd.read_csv(path), read_corrections())
+                orders = partition_by_platform(dictionary().encode_columns(orders))
+                try:
+                    write_snapshot(orders, path, version)
+                    write_rejected(rejected, path)
+                except OSError:
+                    pass  # read-only checkout: keep serving from the CSV
+            store = OrderStore(path, version, orders, rejected)
+            _stores[path] = store
+    return store
+
+
+def open_store(path=BOTH_CSV):
+    """The orders of `path` as the pages read them: load_store, or load_database with ORDERS_BACKEND=sqlite.
+
+    Both answer the same chart queries (cumulative_counts, cube,
+    date_totals, platform_stats, summary, ...).
+    """
+    if BACKEND not in BACKENDS:
+        raise ValueError(f"ORDERS_BACKEND must be one of {BACKENDS}, not {BACKEND!r}")
+    if BACKEND == 'sqlite':
+        return load_database(path)
+    return load_store(path)
+
+
+def load_orders(path=BOTH_CSV):
+    return load_store(path).orders
+
+
+def load_database(path=BOTH_CSV):
+    """Return the OrderDatabase for `path`, the SQLite alternative to load_store.
+
+    The database file is (re)built from the CSV when it is missing or was
+    built from other data; nothing beyond one chunk of orders is held in memory.
+    """
+    path = os.path.abspath(path)
+    with _lock:
+        version = dataset_version(path)
+        cached = _databases.get(path)
+        if cached is None or cached[0] != version:
+            cached = (version, open_database(path, version, read_corrections()))
+            _databases[path] = cached
+    return cached[1]
@@ -0,0 +1,43 @@
+"""Summaries of order exports too large to load at once.
+
+The CSV is read in fixed-size chunks; each chunk is cleaned like the store
+does and folded into running totals, so memory stays bounded by the chunk
+size and the number of order dates; the most ordered names are tracked in
+a fixed number of counters however many distinct names there are::
+
+    python -m orders.streaming big_history.csv
+"""
+import sys
+
+import pandas as pd
+
+from orders.aggregates import OrderSummary
+from orders.cleaning import clean_orders
+
+
+CHUNK_SIZE = 100_000
+
+
+def summarize_csv(path, chunk_size=CHUNK_SIZE, corrections=None):
+    """Summarize the order export at `path`, reading `chunk_size` rows at a time."""
+    summary = OrderSummary()
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        orders, rejected = clean_orders(chunk, corrections)
+        summary.add(orders)
+        summary.rejected += len(rejected)
+    return summary
+
+
+def main(argv):
+    from orders.store import read_corrections
+
+    for path in argv:
+        summary = summarize_csv(path, corrections=read_corrections())
+        print(f"{path}: {summary.orders} orders, Rs {summary.spent} spent, {summary.rejected} rejected")
+        print("Top restaurants:", summary.top_restaurants.top(5))
+        print("Top foods:", summary.top_foods.top(5))
+        print("Top cuisines:", summary.top_cuisines.top(5))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
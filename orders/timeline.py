@@ -0,0 +1,118 @@
+"""Cumulative order counts per date and category, for the animated bar charts.
+
+Each chart animates how often every category (day of the week, meal,
+restaurant, cuisine, food) has been ordered up to each order date. The
+counts of one dimension are built once as a dense int32 matrix with one
+bincount and one cumsum, and the store caches it per dataset version.
+
+Animations show one frame per day, week or month of orders; by default
+the resolution is picked from the date span so that a chart never has
+more than MAX_FRAMES frames.
+"""
+import numpy as np
+import pandas as pd
+
+
+MAX_FRAMES = 60
+RESOLUTIONS = ('day', 'week', 'month')
+
+
+def _periods(dates, resolution):
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    if resolution == 'day':
+        return days
+    if resolution == 'week':
+        return (days + 3) // 7  # weeks starting on Monday; 1970-01-01 was a Thursday
+    if resolution == 'month':
+        return dates.astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"resolution must be 'auto' or one of {RESOLUTIONS}, not {resolution!r}")
+
+
+def frame_ends(dates, resolution='auto', max_frames=MAX_FRAMES):
+    """Last date of each animation frame over the sorted order `dates`.
+
+    A frame covers one day, week or month; 'auto' takes the finest of
+    these that fits in `max_frames`. When the periods still do not fit,
+    evenly spaced ones are kept, always including the last.
+    `max_frames=None` keeps every period.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if len(dates) == 0:
+        return dates
+    if resolution == 'auto':
+        for resolution in RESOLUTIONS:
+            if max_frames is None or len(np.unique(_periods(dates, resolution))) <= max_frames:
+                break
+
+    periods = _periods(dates, resolution)
+    ends = dates[np.append(periods[1:] != periods[:-1], True)]
+    if max_frames is not None and len(ends) > max_frames:
+        ends = ends[np.unique(np.linspace(0, len(ends) - 1, max_frames).round().astype(np.int64))]
+    return ends
+
+
+class CumulativeCounts:
+    """Orders per category up to and including each date.
+
+    `counts[i, j]` is the number of orders of category `labels[j]` placed
+    on or before `dates[i]`. The first row is all zeros, one day before the
+    first order, so animations start from an empty chart.
+    """
+
+    def __init__(self, dates, labels, counts):
+        self.dates = dates
+        self.labels = labels
+        self.counts = counts
+
+    @classmethod
+    def build(cls, date_codes, dates, codes, labels, keep_unused=False, count=None):
+        """Count (date code, category code) pairs; codes below zero are skipped.
+
+        Each pair is one order unless `count` gives the orders it stands
+        for, as for rows already grouped by a database. Categories never
+        ordered are dropped unless `keep_unused`.
+        """
+        known = (codes >= 0) & (date_codes >= 0)
+        cells = date_codes[known].astype(np.int64) * len(labels) + codes[known]
+        weights = None if count is None else count[known]
+        daily = np.bincount(cells, weights=weights, minlength=len(dates) * len(labels))
+        daily = daily.astype(np.int64).reshape(len(dates), len(labels))
+        return cls.from_daily(dates, labels, daily, keep_unused)
+
+    @classmethod
+    def from_daily(cls, dates, labels, daily, keep_unused=False):
+        """Accumulate `daily[i, j]`, the orders of category `labels[j]` on `dates[i]`, e.g. counted by a database."""
+        if not keep_unused:
+            used = daily.any(axis=0)
+            daily, labels = daily[:, used], labels[used]
+
+        counts = np.zeros((len(dates) + 1, len(labels)), dtype=np.int32)
+        np.cumsum(daily, axis=0, dtype=np.int32, out=counts[1:])
+        first = dates[0] - np.timedelta64(1, 'D') if len(dates) else np.datetime64('NaT', 'D')
+        return cls(np.concatenate([[first], dates]).astype('datetime64[D]'), labels, counts)
+
+    def frame(self):
+        """The counts as a DataFrame: one row per date, one column per category."""
+        return pd.DataFrame(self.counts, index=pd.DatetimeIndex(self.dates, name='Date '), columns=self.labels)
+
+    def at_frames(self, resolution='auto', max_frames=MAX_FRAMES):
+        """The counts at the end of each animation frame (see frame_ends), after the zero row."""
+        ends = frame_ends(self.dates[1:], resolution, max_frames)
+        rows = np.append(0, np.searchsorted(self.dates, ends))
+        return CumulativeCounts(self.dates[rows], self.labels, self.counts[rows])
+
+    def long(self, name, resolution='auto', max_frames=MAX_FRAMES):
+        """Long format for plotly: 'Date ', `name`, 'Count' and the frame label 'Date_str'.
+
+        There is one frame per `resolution` period, as chosen by frame_ends.
+        Rows run through every frame of the first category, then the next,
+        like `melt` of the wide frame.
+        """
+        frames = self.at_frames(resolution, max_frames)
+        n_dates, n_labels = frames.counts.shape
+        return pd.DataFrame({
+            'Date ': np.tile(frames.dates, n_labels).astype('datetime64[ns]'),
+            name: np.repeat(np.asarray(frames.labels, dtype=object), n_dates),
+            'Count': frames.counts.T.ravel(),
+            'Date_str': np.tile(np.datetime_as_string(frames.dates, unit='D'), n_labels),
+        })
@@ -11,34 +11,18 @@ import re
 import random
 from collections import Counter
 from wordcloud import WordCloud
+from orders import open_store
+from orders.charts import prepare
+from orders.quantiles import BOX_FIELDS, CumulativeBoxStats
+from orders.timeline import frame_ends
 
-def preprocess_data(filepath):
-    df = pd.read_csv(filepath)
-
-    # Data cleaning
-    df['Food2'].fillna('None', inplace=True)
-    df['Quantity2'].fillna('None', inplace=True)
-    df = df.replace('Manchurian', 'Manchuria')
-    df = df.replace('The pancake co', 'The Pancake co')
-    df = df.replace("L Pino'z", 'La Pinoz')
-    df = df.replace("La Pinozo", 'La Pinoz')
-    df = df.replace("The Good Bowl", 'Good Bowl')
-    df = df.replace("The Nomads Cafe", 'Nomads Cafe')
-    df.iloc[94, df.columns.get_loc('Date ')] = '10/20/24'
-    df['Date '] = pd.to_datetime(df['Date '])
-
-    
-
-    return df
-
-df = preprocess_data("./both.csv") 
+store = open_store("./both.csv")  # in memory, or from SQLite with ORDERS_BACKEND=sqlite
 
 
 
-def generate_restaurant_bar_chart(df):
-    # Get top 10 restaurants by order count
-    restaurant_counts = df['Restaurant'].value_counts().head(10).reset_index()
-    restaurant_counts.columns = ['Restaurant', 'Count']
+def generate_restaurant_bar_chart(top_restaurants):
+    # Top 10 restaurants by order count, from the store's heavy-hitter counters
+    restaurant_counts = pd.DataFrame(top_restaurants.top(10), columns=['Restaurant', 'Count'])
     
     # Create a bar chart using Plotly Express
     fig = px.bar(
@@ -60,28 +44,9 @@ def generate_restaurant_bar_chart(df):
     
     return fig
 
-def generate_animated_restaurant_bar_chart(df):
-    # Ensure the "Date " column is datetime and sort by date
-    df["Date "] = pd.to_datetime(df["Date "])
-    df_sorted = df.sort_values("Date ")
-    
-    # Group by Date and Restaurant; count orders, then pivot so each column is a restaurant
-    pivot = df_sorted.groupby(["Date ", "Restaurant"]).size().unstack(fill_value=0)
-    
-    # Compute cumulative counts so that each frame adds up over time
-    cumulative = pivot.cumsum()
-    
-    # Add an initial row (one day before the earliest date) with zeros (starting with an empty state)
-    initial_date = cumulative.index.min() - pd.Timedelta(days=1)
-    zero_row = pd.DataFrame({col: 0 for col in cumulative.columns}, index=[initial_date])
-    cumulative = pd.concat([zero_row, cumulative]).sort_index()
-    
-    # Reset index and convert from wide to long format
-    cumulative_reset = cumulative.reset_index().rename(columns={"index": "Date "})
-    df_long = cumulative_reset.melt(id_vars="Date ", var_name="Restaurant", value_name="Count")
-    
-    # Create a formatted date string for animation frames
-    df_long["Date_str"] = df_long["Date "].dt.strftime("%Y-%m-%d")
+def generate_animated_restaurant_bar_chart(restaurant_counts):
+    # Cumulative orders per restaurant up to each date (starting from a zero row), in long format
+    df_long = restaurant_counts.long("Restaurant")
     
     # Compute ranking for each date so we can sort dynamically (highest count gets rank 1)
     df_long["Rank"] = df_long.groupby("Date ")["Count"].rank(method="first", ascending=False)
@@ -148,32 +113,9 @@ def generate_animated_restaurant_bar_chart(df):
     
     return fig
 
-def generate_animated_type_histogram(df):
-    # Ensure "Date " is datetime and sort the DataFrame by date
-    df["Date "] = pd.to_datetime(df["Date "])
-    df_sorted = df.sort_values("Date ")
-
-    # Explode the "Type" column: split comma-separated values and strip extra spaces
-    df_sorted["Type"] = df_sorted["Type"].apply(lambda x: [t.strip() for t in x.split(',')])
-    df_exploded = df_sorted.explode("Type")
-    
-    # Group by Date and Type and count occurrences
-    pivot = df_exploded.groupby(["Date ", "Type"]).size().unstack(fill_value=0)
-    
-    # Compute cumulative counts so that each frame adds up over time
-    cumulative = pivot.cumsum()
-    
-    # Add an initial row (one day before the earliest date) with zeros to start animation at 0
-    initial_date = cumulative.index.min() - pd.Timedelta(days=1)
-    zero_row = pd.DataFrame({col: 0 for col in cumulative.columns}, index=[initial_date])
-    cumulative = pd.concat([zero_row, cumulative]).sort_index()
-    
-    # Reset index and convert from wide to long format
-    cumulative_reset = cumulative.reset_index().rename(columns={"index": "Date "})
-    df_long = cumulative_reset.melt(id_vars="Date ", var_name="Type", value_name="Count")
-    
-    # Create a formatted date string for the animation frame
-    df_long["Date_str"] = df_long["Date "].dt.strftime("%Y-%m-%d")
+def generate_animated_type_histogram(cuisine_counts):
+    # Cumulative orders per cuisine up to each date (starting from a zero row), in long format
+    df_long = cuisine_counts.long("Type")
     
     # Create the animated bar chart using Plotly Express
     fig = px.bar(
@@ -210,32 +152,9 @@ def generate_animated_type_histogram(df):
 
 
 
-def generate_animated_food_distribution_chart(df):
-    # Ensure the "Date " column is datetime and sort by date
-    df["Date "] = pd.to_datetime(df["Date "])
-    df_sorted = df.sort_values("Date ")
-    
-    # Melt Food1 and Food2 columns into a long format; remove 'None' entries
-    df_melted = df_sorted.melt(id_vars=["Date "], value_vars=["Food1", "Food2"], value_name="food")
-    df_melted = df_melted[df_melted["food"] != "None"]
-    
-    # Group by Date and food; count occurrences and pivot
-    pivot = df_melted.groupby(["Date ", "food"]).size().unstack(fill_value=0)
-    
-    # Compute cumulative counts over time (each date adds to the previous totals)
-    cumulative = pivot.cumsum()
-    
-    # Add an initial row with zeros (to start the animation from an empty state)
-    initial_date = cumulative.index.min() - pd.Timedelta(days=1)
-    zero_row = pd.DataFrame({col: 0 for col in cumulative.columns}, index=[initial_date])
-    cumulative = pd.concat([zero_row, cumulative]).sort_index()
-    
-    # Convert the cumulative DataFrame to long format
-    cumulative_reset = cumulative.reset_index().rename(columns={"index": "Date "})
-    df_long = cumulative_reset.melt(id_vars="Date ", var_name="food", value_name="Count")
-    
-    # Create a formatted date string for animation frames
-    df_long["Date_str"] = df_long["Date "].dt.strftime("%Y-%m-%d")
+def generate_animated_food_distribution_chart(food_counts):
+    # Cumulative line items per food up to each date (starting from a zero row), in long format
+    df_long = food_counts.long("food")
     
     # Create the animated horizontal bar chart
     fig = px.bar(
@@ -271,11 +190,14 @@ def generate_animated_food_distribution_chart(df):
     return fig
 
 
-def generate_wordcloud_figure(corpus, width=800, height=400, title="Word Cloud"):
-    # Generate the word cloud image from the corpus
-    wc = WordCloud(width=width, height=height, background_color='white').generate(corpus)
+def generate_wordcloud_image(frequencies, width=800, height=400):
+    # Generate the word cloud image from name -> count frequencies
+    wc = WordCloud(width=width, height=height, background_color='white').generate_from_frequencies(frequencies)
     # Convert the WordCloud image to a NumPy array
-    wc_array = wc.to_array()
+    return wc.to_array()
+
+
+def generate_wordcloud_figure(wc_array, title="Word Cloud"):
     # Create an interactive Plotly figure using px.imshow
     fig = px.imshow(wc_array, title=title)
     # Hide axes for a cleaner look
@@ -289,105 +211,109 @@ def generate_wordcloud_figure(corpus, width=800, height=400, title="Word Cloud")
     return fig
 
 
-def generate_animated_cumulative_cuisine_price_boxplot(df):
-    # Convert and sort dates
-    df["Date "] = pd.to_datetime(df["Date "])
-    df_sorted = df.sort_values("Date ")
-    
-    # Expand the "Type" column: split comma-separated values and clean strings
-    expanded_rows = []
-    for idx, row in df_sorted.iterrows():
-        types = row["Type"].split(',')
-        for t in types:
-            expanded_rows.append({
-                "Cuisine": t.strip(),
-                "Price": row["Price"],
-                "Platform": str(row["Platform"]).strip().capitalize(),  # e.g., "swiggy" -> "Swiggy"
-                "Date": row["Date "]
-            })
-    df_expanded = pd.DataFrame(expanded_rows)
-    
-    # Force Platform as categorical with fixed categories
-    df_expanded["Platform"] = pd.Categorical(
-        df_expanded["Platform"],
-        categories=["Zomato", "Swiggy"],
-        ordered=True
-    )
-    
-    # Build cumulative dataset: for each day, include all orders up to that day.
-    all_dates = pd.date_range(start=df_expanded["Date"].min(), end=df_expanded["Date"].max(), freq="D")
-    cumulative_frames = []
-    for d in all_dates:
-        frame_df = df_expanded[df_expanded["Date"] <= d].copy()
-        frame_df["Frame"] = d.strftime("%Y-%m-%d")
-        cumulative_frames.append(frame_df)
-    df_cumulative = pd.concat(cumulative_frames, ignore_index=True)
-    
-    # Get unique frames and cuisines from the cumulative data.
-    unique_frames = df_cumulative["Frame"].unique()
-    unique_cuisines = df_cumulative["Cuisine"].unique()
+def generate_animated_cumulative_cuisine_price_boxplot(cuisine_prices):
     platforms = ["Zomato", "Swiggy"]
+    colors = {"Zomato": "red", "Swiggy": "orange"}
+    
+    # Orders per date, platform, cuisine and price, an order once for each of its cuisines
+    df_expanded = cuisine_prices.rename(columns={"Date ": "Date"})
+    # Platform and Cuisine are categoricals: only their few labels are looked up, rows keep their codes
+    platform_codes = pd.Index(platforms).get_indexer(df_expanded["Platform"].cat.categories)[
+        df_expanded["Platform"].cat.codes.to_numpy()
+    ]
+    df_expanded = df_expanded[platform_codes >= 0]
+    platform_codes = platform_codes[platform_codes >= 0]
+    
+    # One frame per day, week or month of orders (within the frame budget); every frame covers all orders up to its end
+    order_dates = df_expanded["Date"].to_numpy("datetime64[D]")
+    ends = frame_ends(np.unique(order_dates))
+    frame_codes = np.searchsorted(ends, order_dates)
+    
+    # Cuisines in the order they were first ordered; each (cuisine, platform) pair is one box
+    cuisine_codes = df_expanded["Cuisine"].cat.codes.to_numpy()
+    first_ordered = pd.unique(cuisine_codes[np.argsort(frame_codes, kind="stable")])
+    cuisine_labels = df_expanded["Cuisine"].cat.categories.to_numpy()[first_ordered]
+    cuisine_rank = np.zeros(len(df_expanded["Cuisine"].cat.categories), dtype=np.int64)
+    cuisine_rank[first_ordered] = np.arange(len(first_ordered))
+    group_codes = cuisine_rank[cuisine_codes] * len(platforms) + platform_codes
+    
+    # Quartiles, whiskers and outliers of every box, updated day by day as orders arrive
+    boxes = CumulativeBoxStats.build(
+        frame_codes, len(ends), group_codes, len(cuisine_labels) * len(platforms), df_expanded["Price"].to_numpy(),
+        weights=df_expanded["Count"].to_numpy()
+    )
     
-    # Create a complete grid of all combinations (Frame x Cuisine x Platform)
-    complete_index = pd.MultiIndex.from_product([unique_frames, unique_cuisines, platforms],
-                                                  names=["Frame", "Cuisine", "Platform"])
-    complete_df = pd.DataFrame(index=complete_index).reset_index()
-    
-    # Merge the complete grid with our cumulative data on (Frame, Cuisine, Platform)
-    df_merged = pd.merge(complete_df, df_cumulative, on=["Frame", "Cuisine", "Platform"], how="left")
-    # The "Price" from the cumulative data will be NaN for missing combinations.
-    # We'll keep those rows so that Plotly always sees both platforms.
+    def frame_traces(frame):
+        traces = []
+        for p, platform in enumerate(platforms):
+            groups = np.arange(p, len(cuisine_labels) * len(platforms), len(platforms))
+            seen = groups[boxes.counts[frame, groups] > 0]
+            stats = boxes.stats[frame, seen]
+            traces.append(go.Box(
+                x=cuisine_labels[seen // len(platforms)],
+                **{field: stats[:, i] for i, field in enumerate(BOX_FIELDS)},
+                name=platform, legendgroup=platform, offsetgroup=platform,
+                marker_color=colors[platform], boxpoints=False
+            ))
+        for p, platform in enumerate(platforms):
+            outlier_groups, outlier_prices = boxes.outliers[frame]
+            mine = outlier_groups % len(platforms) == p
+            traces.append(go.Scatter(
+                x=cuisine_labels[outlier_groups[mine] // len(platforms)], y=outlier_prices[mine],
+                mode="markers", name=platform, legendgroup=platform, offsetgroup=platform,
+                marker_color=colors[platform], showlegend=False
+            ))
+        return traces
+    
+    # Precomputed boxes only: the payload grows with days and cuisines, not with orders
+    frame_names = np.datetime_as_string(ends, unit="D")
+    fig = go.Figure(
+        data=frame_traces(len(ends) - 1),
+        frames=[go.Frame(data=frame_traces(f), name=name) for f, name in enumerate(frame_names)]
+    )
     
-    # Create the animated box plot using Plotly Express.
-    fig = px.box(
-        df_merged,
-        x="Cuisine",
-        y="Price",
-        color="Platform",
-        animation_frame="Frame",
-        category_orders={"Platform": ["Zomato", "Swiggy"]},
-        color_discrete_map={"Zomato": "red", "Swiggy": "orange"},
-        title="Box Plot of Cuisine vs. Price for Zomato and Swiggy (Cumulative)",
-        labels={"Cuisine": "Cuisine Type", "Price": "Price"}
+    # Play/pause buttons and a date slider, like the plotly express animations
+    fig.update_layout(
+        updatemenus=[dict(
+            type="buttons", direction="left", x=0.1, y=0, xanchor="right", yanchor="top", pad=dict(r=10, t=70),
+            buttons=[
+                dict(label="&#9654;", method="animate",
+                     args=[None, dict(frame=dict(duration=500, redraw=True), fromcurrent=True, transition=dict(duration=500))]),
+                dict(label="&#9724;", method="animate",
+                     args=[[None], dict(frame=dict(duration=0, redraw=True), mode="immediate", transition=dict(duration=0))]),
+            ]
+        )],
+        sliders=[dict(
+            active=len(frame_names) - 1, x=0.1, y=0, len=0.9, xanchor="left", yanchor="top", pad=dict(b=10, t=60),
+            currentvalue=dict(prefix="Frame="),
+            steps=[dict(label=name, method="animate",
+                        args=[[name], dict(frame=dict(duration=0, redraw=True), mode="immediate", transition=dict(duration=0))])
+                   for name in frame_names]
+        )]
     )
     
     # Update layout for clarity: rotate x-axis labels and set transparent backgrounds.
     fig.update_layout(
-        xaxis_tickangle=45,
+        title="Box Plot of Cuisine vs. Price for Zomato and Swiggy (Cumulative)",
+        xaxis=dict(title="Cuisine Type", categoryorder="array", categoryarray=list(cuisine_labels), tickangle=45),
+        yaxis=dict(title="Price", range=[0, df_expanded["Price"].max() * 1.05]),
+        boxmode="group",
+        scattermode="group",
+        legend_title_text="Platform",
         plot_bgcolor="rgba(0,0,0,0)",
         paper_bgcolor="rgba(0,0,0,0)"
     )
-    
-    # Force the final frame to be displayed by default.
-    if fig.frames:
-        fig.layout.sliders[0].active = len(fig.frames) - 1
-        final_frame = fig.frames[-1]
-        for i, trace in enumerate(fig.data):
-            trace.x = final_frame.data[i].x
-            trace.y = final_frame.data[i].y
             
     return fig
 
 
-def generate_cuisine_meal_heatmap(df):
-    # Explode the 'Type' column into individual cuisines and strip whitespace
-    df['Type'] = df['Type'].str.split(',')
-    df_exploded = df.explode('Type')
-    df_exploded['Type'] = df_exploded['Type'].str.strip()
+def generate_cuisine_meal_heatmap(cuisine_cube):
+    # Total quantity ordered per cuisine and meal, rolled up from the cuisine cube
+    heatmap_data = cuisine_cube.table('Cuisine', 'Meal', 'quantity')
     
-    # Convert quantity columns to numeric and fill missing values with 0
-    df_exploded['Quantity1'] = pd.to_numeric(df_exploded['Quantity1'], errors='coerce').fillna(0)
-    df_exploded['Quantity2'] = pd.to_numeric(df_exploded['Quantity2'], errors='coerce').fillna(0)
-    df_exploded['Total_Quantity'] = df_exploded['Quantity1'] + df_exploded['Quantity2']
-    
-    # Create a pivot table: index = 'Type', columns = 'Meal', values = sum of 'Total_Quantity'
-    heatmap_data = df_exploded.pivot_table(
-        index='Type',
-        columns='Meal',
-        values='Total_Quantity',
-        aggfunc='sum',
-        fill_value=0
-    )
+    # Keep only the cuisines and meals that were actually ordered
+    orders = cuisine_cube.table('Cuisine', 'Meal')
+    heatmap_data = heatmap_data.loc[orders.any(axis=1), orders.any(axis=0)]
     
     # Create the heatmap using Plotly Express
     fig = px.imshow(
@@ -411,25 +337,31 @@ def generate_cuisine_meal_heatmap(df):
     return fig
 
 
-def generate_top10_restaurant_boxplot(df):
-    # Compute top 10 restaurants by frequency
-    top10_restaurants = df['Restaurant'].value_counts().head(10).index.tolist()
-    
-    # Filter the DataFrame to only include rows for the top 10 restaurants
-    df_top = df[df['Restaurant'].isin(top10_restaurants)]
-    
-    # Create a box plot using Plotly Express
-    fig = px.box(
-        df_top,
-        x='Restaurant',
-        y='Price',
-        title='Box Plot of Price by Restaurant (Top 10)',
-        labels={'Restaurant': 'Restaurant', 'Price': 'Price'},
-        category_orders={'Restaurant': top10_restaurants}  # maintain the order from most frequent
-    )
+def generate_top10_restaurant_boxplot(top_restaurants, sketches):
+    # Top 10 restaurants by frequency, from the store's heavy-hitter counters
+    top10_restaurants = top_restaurants.names(10)
+    
+    # Quartiles and whiskers of each restaurant come from the store's per-restaurant price sketches
+    stats = [sketches[name].box_stats() for name in top10_restaurants]
+    boxes = np.array([box for box, _ in stats])
+    fig = go.Figure()
+    fig.add_trace(go.Box(
+        x=top10_restaurants,  # maintain the order from most frequent
+        q1=boxes[:, 0], median=boxes[:, 1], q3=boxes[:, 2], lowerfence=boxes[:, 3], upperfence=boxes[:, 4],
+        name="Price", marker_color="#636EFA", boxpoints=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=[name for name, (_, outliers) in zip(top10_restaurants, stats) for _ in outliers],
+        y=np.concatenate([outliers for _, outliers in stats]),
+        mode="markers", name="Price", marker_color="#636EFA", showlegend=False
+    ))
     
     # Update layout: rotate x-axis labels and use transparent background
     fig.update_layout(
+        title='Box Plot of Price by Restaurant (Top 10)',
+        xaxis_title='Restaurant',
+        yaxis_title='Price',
+        showlegend=False,
         xaxis_tickangle=45,
         plot_bgcolor="rgba(0,0,0,0)",
         paper_bgcolor="rgba(0,0,0,0)"
@@ -575,22 +507,20 @@ st.markdown(
 )
 
 
-food_corpus = (
-    ' '.join(df[df['Food1'] != 'None']['Food1'].astype(str)) + ' ' +
-    ' '.join(df[df['Food2'] != 'None']['Food2'].astype(str))
-)
-restaurant_corpus = ' '.join(df[df['Restaurant'] != 'None']['Restaurant'].astype(str))
+# Names are counted by the store (on dictionary codes, or in SQLite); only the counts reach the word clouds
+food_frequencies = store.food_counts().to_dict()
+restaurant_frequencies = store.value_counts("Restaurant").drop("None", errors="ignore").to_dict()
 
-# Generate word cloud figures
-restaurant_wc_fig = generate_wordcloud_figure(restaurant_corpus, title="Restaurant Word Cloud")
-food_wc_fig = generate_wordcloud_figure(food_corpus, title="Food Word Cloud")
+# Lay out both word clouds on the shared pool; the food one is ready by the end of the page
+restaurant_wc = prepare(generate_wordcloud_image, restaurant_frequencies)
+food_wc = prepare(generate_wordcloud_image, food_frequencies)
 
-st.plotly_chart(restaurant_wc_fig, use_container_width=True)
+st.plotly_chart(generate_wordcloud_figure(restaurant_wc.result(), title="Restaurant Word Cloud"), use_container_width=True)
 
 st.markdown("### My Top 5 Restaurants Are:")
 
-# Replace these with your actual top restaurant names
-top_restaurants = ["Haldiram's", "La Pinoz", "Pizza Hut", "90's Cafe Chapter 2", "Nomad's Cafe"]
+# The most ordered restaurants, kept up to date as orders are ingested
+top_restaurants = store.summary.top_restaurants.names(5)
 
 # Create 5 columns for the top 5 restaurants
 cols = st.columns(5)
@@ -629,14 +559,14 @@ with col_right:
 with col_content:
     if st.session_state["restaurant_slide"] == 2:
         st.markdown("### Sreya's Top Restaurants")
-        st.plotly_chart(generate_restaurant_bar_chart(df), use_container_width=True)
+        st.plotly_chart(generate_restaurant_bar_chart(store.summary.top_restaurants), use_container_width=True)
     elif st.session_state["restaurant_slide"] == 1:
         st.markdown("### Restaurants' Frequencies Over Time")
-        st.plotly_chart(generate_animated_restaurant_bar_chart(df), use_container_width=True)
+        st.plotly_chart(generate_animated_restaurant_bar_chart(store.cumulative_counts("Restaurant")), use_container_width=True)
 
     elif st.session_state["restaurant_slide"] == 3:
         st.markdown("### Box Plots for Top 10 Restaurants")
-        st.plotly_chart(generate_top10_restaurant_boxplot(df), use_container_width=True)
+        st.plotly_chart(generate_top10_restaurant_boxplot(store.summary.top_restaurants, store.summary.price_sketches["Restaurant"]), use_container_width=True)
         st.markdown(
     """
     <div style="margin-top: 30px; padding: 15px; background-color: #f8f9fa; 
@@ -656,8 +586,8 @@ st.markdown("<br>", unsafe_allow_html=True)
 
 st.markdown("### My Top 3 Cuisines Are:")
 
-# Replace these with your actual top restaurant names
-top_cuisines = ["American", "North Indian", "Italian"]
+# The most ordered cuisines, kept up to date as orders are ingested
+top_cuisines = store.summary.top_cuisines.names(3)
 
 # Create 5 columns for the top 5 restaurants
 cols = st.columns(3)
@@ -672,10 +602,7 @@ for col, restaurant in zip(cols, top_cuisines):
         unsafe_allow_html=True
     )
 st.markdown("<br><br>", unsafe_allow_html=True)
-# st.plotly_chart(generate_animated_type_histogram(df), use_container_width=True)
-
-
-# st.plotly_chart(generate_animated_cumulative_cuisine_price_boxplot(df), use_container_width=True)
+# st.plotly_chart(generate_animated_type_histogram(store.cumulative_counts("Cuisine")), use_container_width=True)
 
 
 # st.markdown(
@@ -718,7 +645,7 @@ with col_right:
 with col_content:
     if st.session_state["analysis_slide"] == 1:
         st.markdown("### Cumulative Distribution of Cuisine Types")
-        st.plotly_chart(generate_animated_type_histogram(df), use_container_width=True)
+        st.plotly_chart(generate_animated_type_histogram(store.cumulative_counts("Cuisine")), use_container_width=True)
         st.markdown(
     """
     <div style="margin-top: 30px; padding: 15px; background-color: #f8f9fa; 
@@ -739,7 +666,7 @@ with col_content:
 
     elif st.session_state["analysis_slide"] == 2:
         st.markdown("### Cuisine vs. Price for Zomato & Swiggy")
-        st.plotly_chart(generate_animated_cumulative_cuisine_price_boxplot(df), use_container_width=True)
+        st.plotly_chart(generate_animated_cumulative_cuisine_price_boxplot(store.cuisine_prices()), use_container_width=True)
         st.markdown(
             """
             <div style="margin-top: 30px; padding: 15px; background-color: #f8f9fa; 
@@ -758,12 +685,12 @@ with col_content:
         )
 
     elif st.session_state['analysis_slide'] == 3:
-        st.plotly_chart(generate_cuisine_meal_heatmap(df), use_container_width=True)
+        st.plotly_chart(generate_cuisine_meal_heatmap(store.cube(cuisines=True)), use_container_width=True)
 
 
 
 st.markdown("<br><br>", unsafe_allow_html=True)
-st.plotly_chart(generate_animated_food_distribution_chart(df), use_container_width=True)
+st.plotly_chart(generate_animated_food_distribution_chart(store.cumulative_counts("Food")), use_container_width=True)
 st.markdown(
     """
     <div style="margin-top: 30px; padding: 15px; background-color: #f8f9fa; 
@@ -784,5 +711,5 @@ st.markdown("<br><br>", unsafe_allow_html=True)
 
 # Display the figures in Streamlit
 st.markdown("<br>", unsafe_allow_html=True)
-st.plotly_chart(food_wc_fig, use_container_width=True)
+st.plotly_chart(generate_wordcloud_figure(food_wc.result(), title="Food Word Cloud"), use_container_width=True)
 
@@ -6,60 +6,11 @@ import plotly.express as px
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
-
-
-
-def preprocess_data_zomato(filepath):
-    df = pd.read_csv(filepath)
-
-    # Data cleaning
-    df['Food2'].fillna('None', inplace=True)
-    df['Quantity2'].fillna('None', inplace=True)
-    df = df.replace('Manchurian', 'Manchuria')
-    df = df.replace('The pancake co', 'The Pancake co')
-    df = df.replace("L Pino'z", 'La Pinoz')
-    df = df.replace("La Pinozo", 'La Pinoz')
-    df = df.replace("The Good Bowl", 'Good Bowl')
-    df = df.replace("The Nomads Cafe", 'Nomads Cafe')
-    df.iloc[50, df.columns.get_loc('Date ')] = '10/20/24'
-    df['Date '] = pd.to_datetime(df['Date '])
-
-    return df
-
-def preprocess_data_both(filepath):
-    df = pd.read_csv(filepath)
-
-    # Data cleaning
-    df['Food2'].fillna('None', inplace=True)
-    df['Quantity2'].fillna('None', inplace=True)
-    df = df.replace('Manchurian', 'Manchuria')
-    df = df.replace('The pancake co', 'The Pancake co')
-    df = df.replace("L Pino'z", 'La Pinoz')
-    df = df.replace("La Pinozo", 'La Pinoz')
-    df = df.replace("The Good Bowl", 'Good Bowl')
-    df = df.replace("The Nomads Cafe", 'Nomads Cafe')
-    df.iloc[94, df.columns.get_loc('Date ')] = '10/20/24'
-    df['Date '] = pd.to_datetime(df['Date '])
-
-    return df
-
-def preprocess_data_swiggy(filepath):
-    df = pd.read_csv(filepath)
-
-    # Data cleaning
-    df['Food2'].fillna('None', inplace=True)
-    df['Quantity2'].fillna('None', inplace=True)
-    df = df.replace('Manchurian', 'Manchuria')
-    df = df.replace('The pancake co', 'The Pancake co')
-    df = df.replace("L Pino'z", 'La Pinoz')
-    df = df.replace("La Pinozo", 'La Pinoz')
-    df = df.replace("The Good Bowl", 'Good Bowl')
-    df = df.replace("The Nomads Cafe", 'Nomads Cafe')
-    # df.iloc[50, df.columns.get_loc('Date ')] = '10/20/24'
-    df['Date '] = pd.to_datetime(df['Date '])
-
-    return df
+from orders import open_store
+from orders.charts import prepare
+from orders.aggregates import PRICE_BIN
+
+
 
 # Function to generate a donut chart with custom colors
 def generate_donut_chart(platform_counts):
@@ -196,21 +147,35 @@ def generate_scatter_plot(df):
 
 
 
-def generate_price_histogram(df):
-    # Separate data for each platform
-    df_zomato = df[df["Platform"] == "Zomato"]["Price"]
-    df_swiggy = df[df["Platform"] == "Swiggy"]["Price"]
-    
-    # Create a distribution plot with two datasets
-    fig = ff.create_distplot(
-        [df_zomato, df_swiggy],       # List of arrays of data
-        group_labels=["Zomato", "Swiggy"],  # Names for each dataset
-        bin_size=20,                 # Bin size for histogram
-        curve_type="kde",            # Add KDE curve
-        colors=["red", "orange"]     # Color scheme for each dataset
-    )
+def generate_price_histogram(stats):
+    # Both platforms share one set of bins and one KDE grid over the full price range
+    fig = go.Figure()
+    for name, color in [("Zomato", "red"), ("Swiggy", "orange")]:
+        if name not in stats:
+            continue
+        # Histogram bins and KDE curve come from the store's platform stats; only their points are sent to the browser
+        (edges, densities), (grid, kde) = stats[name].histogram, stats[name].kde
+        fig.add_trace(go.Bar(
+            x=edges + PRICE_BIN / 2,
+            y=densities,
+            width=PRICE_BIN,
+            marker_color=color,
+            opacity=0.7,
+            name=name,
+            legendgroup=name
+        ))
+        fig.add_trace(go.Scatter(
+            x=grid,
+            y=kde,
+            mode="lines",
+            line=dict(color=color),
+            name=name,
+            legendgroup=name,
+            showlegend=False
+        ))
 
     fig.update_layout(
+        barmode="overlay",
         title="Price Distribution by Platform",
         xaxis_title="Price",
         yaxis_title="Density",
@@ -222,8 +187,10 @@ def generate_price_histogram(df):
 
 
 
-def generate_day_distribution_plot(df):
-    day_counts = df.groupby(['Day', 'Platform']).size().reset_index(name='Count')
+def generate_day_distribution_plot(stats):
+    # Orders per day (in week order) and platform from the platform stats; combinations without orders are left out
+    day_counts = pd.DataFrame({platform: s.days for platform, s in stats.items()}).rename_axis(columns='Platform').stack()
+    day_counts = day_counts[day_counts > 0].reset_index(name='Count')
 
     # Create the bar chart with separate bars for each platform
     fig = px.bar(
@@ -248,8 +215,10 @@ def generate_day_distribution_plot(df):
     return fig
     
 
-def generate_meal_distribution_plot(df):
-    grouped = df.groupby(["Meal", "Platform"]).size().reset_index(name="Count")
+def generate_meal_distribution_plot(stats):
+    # Orders per meal and platform from the platform stats; combinations without orders are left out
+    grouped = pd.DataFrame({platform: s.meals for platform, s in stats.items()}).rename_axis(columns="Platform").stack()
+    grouped = grouped[grouped > 0].reset_index(name="Count")
 
     # Create a grouped bar chart (two columns per Meal, one for each platform)
     fig = px.bar(
@@ -275,19 +244,28 @@ def generate_meal_distribution_plot(df):
 
     
 
-def generate_box_plot_price(df):
-    fig = px.box(
-        df,
-        x="Platform",
-        y="Price",
-        color="Platform",  # Color by platform
-        color_discrete_map={"Zomato": "red", "Swiggy": "orange"},
-        title="Box Plot of Price by Platform",
-        labels={"Platform": "Platform", "Price": "Price"}
-    )
+def generate_box_plot_price(stats):
+    # Quartiles and whiskers come from the store's platform stats; only outliers are points
+    fig = go.Figure()
+    for platform, color in [("Zomato", "red"), ("Swiggy", "orange")]:
+        if platform not in stats:
+            continue
+        (q1, median, q3, lowerfence, upperfence), outliers = stats[platform].box, stats[platform].outliers
+        fig.add_trace(go.Box(
+            x=[platform], q1=[q1], median=[median], q3=[q3], lowerfence=[lowerfence], upperfence=[upperfence],
+            name=platform, legendgroup=platform, marker_color=color, boxpoints=False
+        ))
+        fig.add_trace(go.Scatter(
+            x=[platform] * len(outliers), y=outliers, mode="markers",
+            name=platform, legendgroup=platform, marker_color=color, showlegend=False
+        ))
     
     # Optional: Update the layout for a cleaner look
     fig.update_layout(
+        title="Box Plot of Price by Platform",
+        xaxis_title="Platform",
+        yaxis_title="Price",
+        legend_title_text="Platform",
         plot_bgcolor="rgba(0,0,0,0)",
         paper_bgcolor="rgba(0,0,0,0)"
     )
@@ -295,29 +273,45 @@ def generate_box_plot_price(df):
     return fig
 
 
-def generate_day_timeslot_heatmap_px(df):
-    # Ensure 'Time' is datetime
-    df["Time"] = pd.to_datetime(df["Time"])
-    
-    # Extract the hour and create 3-hour bins
-    df["Hour"] = df["Time"].dt.hour
-    df["TimeSlot"] = pd.cut(
-        df["Hour"],
-        bins=range(0, 25, 3),
-        right=False,
-        labels=[
-            '00:00-02:59', '03:00-05:59', '06:00-08:59', '09:00-11:59',
-            '12:00-14:59', '15:00-17:59', '18:00-20:59', '21:00-23:59'
-        ]
+def generate_price_difference_plot(comparisons):
+    # Zomato minus Swiggy median and mean price, with 95% bootstrap intervals and permutation p-values
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=[c.difference for c in comparisons],
+        y=[c.statistic.title() for c in comparisons],
+        error_x=dict(
+            type="data",
+            symmetric=False,
+            array=[c.high - c.difference for c in comparisons],
+            arrayminus=[c.difference - c.low for c in comparisons],
+            color="red",
+            thickness=2
+        ),
+        mode="markers",
+        marker=dict(color="red", size=12, line=dict(width=2, color="orange")),
+        customdata=[[c.low, c.high, c.p_value] for c in comparisons],
+        hovertemplate="%{y}: Rs %{x:.1f} (95% CI %{customdata[0]:.1f} to %{customdata[1]:.1f}, p = %{customdata[2]:.3f})<extra></extra>",
+        name="Zomato - Swiggy"
+    ))
+
+    # No difference between the platforms
+    fig.add_vline(x=0, line_dash="dash", line_color="gray")
+
+    fig.update_layout(
+        title="Price Difference, Zomato minus Swiggy (95% bootstrap intervals)",
+        xaxis_title="Difference in Price (Rs)",
+        yaxis_title="Statistic",
+        height=320,
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)"
     )
-    
-    # Ensure 'Day' is ordered correctly
-    days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    df["Day"] = pd.Categorical(df["Day"], categories=days_order, ordered=True)
-    
-    # Group by Day and TimeSlot, count orders, and unstack to create a pivot table
-    heatmap_data = df.groupby(["Day", "TimeSlot"]).size().unstack(fill_value=0)
-    heatmap_data = heatmap_data.reindex(days_order)  # Ensure correct day order
+
+    return fig
+
+
+def generate_day_timeslot_heatmap_px(cube):
+    # Orders per day (in week order) and 3-hour time slot, rolled up from the order cube
+    heatmap_data = cube.table("Day", "TimeSlot")
 
     # Create the heatmap using Plotly Express' imshow
     fig = px.imshow(
@@ -342,36 +336,21 @@ def generate_day_timeslot_heatmap_px(df):
 
 
 
-def generate_cdf_plot(df):
-    df_zomato = df[df["Platform"] == "Zomato"]
-    df_swiggy = df[df["Platform"] == "Swiggy"]
-    
-    # Compute cumulative data for Zomato
-    sorted_prices_zomato = np.sort(df_zomato["Price"])
-    cumulative_percentage_zomato = np.arange(1, len(sorted_prices_zomato) + 1) / len(sorted_prices_zomato) * 100
-    
-    # Compute cumulative data for Swiggy
-    sorted_prices_swiggy = np.sort(df_swiggy["Price"])
-    cumulative_percentage_swiggy = np.arange(1, len(sorted_prices_swiggy) + 1) / len(sorted_prices_swiggy) * 100
-    
-    # Create the figure and add traces for each platform
+def generate_cdf_plot(stats):
+    # Create the figure and add a trace for each platform with orders
     fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=sorted_prices_zomato,
-        y=cumulative_percentage_zomato,
-        mode="lines",
-        line=dict(color="red", width=2),
-        name="Zomato"
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=sorted_prices_swiggy,
-        y=cumulative_percentage_swiggy,
-        mode="lines",
-        line=dict(color="orange", width=2),
-        name="Swiggy"
-    ))
+    for name, color in [("Zomato", "red"), ("Swiggy", "orange")]:
+        if name not in stats:
+            continue
+        # The ECDF line through every order comes from the platform stats' price counts
+        x, y = stats[name].ecdf_points()
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=y * 100,
+            mode="lines",
+            line=dict(color=color, width=2),
+            name=name
+        ))
     
     fig.update_layout(
         title="Cumulative Percentage of Orders by Price",
@@ -384,13 +363,9 @@ def generate_cdf_plot(df):
     
     return fig
 
-def generate_meal_popularity_heatmap(df):
-    # Ensure 'Day' is a categorical variable with the correct order
-    days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    df['Day'] = pd.Categorical(df['Day'], categories=days_order, ordered=True)
-    
-    # Group by 'Meal' and 'Day' to calculate order frequency and pivot the result
-    heatmap_data_freq = df.groupby(['Meal', 'Day']).size().unstack(fill_value=0)
+def generate_meal_popularity_heatmap(cube):
+    # Orders per meal and day (in week order), rolled up from the order cube
+    heatmap_data_freq = cube.table('Meal', 'Day')
     
     # Create a heatmap using Plotly Express' imshow
     fig = px.imshow(
@@ -535,12 +510,16 @@ st.markdown(
 st.markdown("<br><br>", unsafe_allow_html=True)
 
 
-df_zomato = preprocess_data_zomato("./zomato.csv")  # Replace with your actual CSV file
-df_swiggy = preprocess_data_swiggy("./swiggy.csv")
-df = preprocess_data_both("./both.csv")
+# Per-platform statistics come from one pass over the one dataset; no separate CSVs to read
+store = open_store("./both.csv")  # in memory, or from SQLite with ORDERS_BACKEND=sqlite
+platform_stats = store.platform_stats()  # price counts, histograms, quartiles and day/meal counts per platform
 
-total_zomato = len(df_zomato)
-total_swiggy = len(df_swiggy)
+# The bootstrap and permutation tests run on the shared pool during the counter animations
+price_gap = prepare(store.price_differences, "Zomato", "Swiggy")
+
+# A platform without orders has no stats and counts zero
+total_zomato = len(platform_stats.get("Zomato", ()))
+total_swiggy = len(platform_stats.get("Swiggy", ()))
 
 # Create two columns side-by-side for the counters
 col1, col2 = st.columns(2)
@@ -622,7 +601,7 @@ st.markdown("<br><br>", unsafe_allow_html=True)
 
 
 # Count occurrences of each platform
-platform_counts = df['Platform'].value_counts()
+platform_counts = store.value_counts("Platform")
 
 # Layout using columns for side-by-side alignment
 col1, col2 = st.columns([1, 1])  # Adjust width ratio as needed
@@ -681,7 +660,7 @@ with col_content:
             
 
         # with col1:
-            st.plotly_chart(generate_scatter_plot(df), use_container_width=True)
+            st.plotly_chart(generate_scatter_plot(store.order_prices()), use_container_width=True)
             st.markdown(
                 """
                 <div style=" padding: 15px; background-color: #f8f9fa; border-radius: 10px; border-right: 5px solid #FF4B4B; height: 100%;">
@@ -702,7 +681,7 @@ with col_content:
        
 
         # with col2:
-            st.plotly_chart(generate_cdf_plot(df), use_container_width=True)
+            st.plotly_chart(generate_cdf_plot(platform_stats), use_container_width=True)
             st.markdown(
                """
                 <div style=" padding: 15px; background-color: #f8f9fa; border-radius: 10px; border-right: 5px solid #FF4B4B; height: 100%;">
@@ -717,11 +696,11 @@ with col_content:
 
     elif st.session_state["slide"] == 4:  # Adjust the slide number as needed
        
-            st.plotly_chart(generate_price_histogram(df), use_container_width=True)
+            st.plotly_chart(generate_price_histogram(platform_stats), use_container_width=True)
 
         
     elif st.session_state['slide'] == 2:
-        st.plotly_chart(generate_box_plot_price(df), use_container_width=True)
+        st.plotly_chart(generate_box_plot_price(platform_stats), use_container_width=True)
         st.markdown(
                 """
                 <div style=" padding: 15px; background-color: #f8f9fa; border-radius: 10px; border-right: 5px solid #FF4B4B; height: 100%;">
@@ -734,6 +713,24 @@ with col_content:
                 unsafe_allow_html=True
             )
 
+        # Is the gap real? Bootstrap intervals and permutation tests of the price difference
+        price_differences = price_gap.result()
+        st.plotly_chart(generate_price_difference_plot(price_differences), use_container_width=True)
+        findings = " ".join(
+            f"The {c.statistic} Zomato order costs Rs {abs(c.difference):.0f} {'more' if c.difference >= 0 else 'less'} than on Swiggy "
+            f"(95% interval Rs {c.low:.0f} to Rs {c.high:.0f}, permutation p = {c.p_value:.2f})."
+            for c in price_differences
+        )
+        st.markdown(
+                f"""
+                <div style=" padding: 15px; background-color: #f8f9fa; border-radius: 10px; border-right: 5px solid #FF4B4B; height: 100%;">
+                    <p style="color: black;"> {findings}
+                      Intervals that cross zero mean the gap could just be down to which orders I happened to place.</p>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
         
 
 
@@ -766,7 +763,7 @@ with col_content:
         # col1, col2 = st.columns([1.5, 1])
 
         # with col1:
-        st.plotly_chart(generate_day_distribution_plot(df), use_container_width=True)
+        st.plotly_chart(generate_day_distribution_plot(platform_stats), use_container_width=True)
 
         # with col2:
         st.markdown(
@@ -784,7 +781,7 @@ with col_content:
         # col1, col2 = st.columns([1.5, 1])
 
         # with col1:
-        st.plotly_chart(generate_meal_distribution_plot(df), use_container_width=True)
+        st.plotly_chart(generate_meal_distribution_plot(platform_stats), use_container_width=True)
 
         # with col2:
         st.markdown(
@@ -0,0 +1,118 @@
+"""The in-memory store and the SQLite database answer every chart query alike."""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from orders import store as stores
+
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def backends(tmp_path_factory):
+    # A copy of both.csv, so the snapshot, database and dictionary are written next to it, not into the checkout
+    directory = tmp_path_factory.mktemp('orders')
+    path = shutil.copy(os.path.join(DATA_DIR, 'both.csv'), directory)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(stores, 'DICTIONARY_JSON', str(directory / 'dictionary.json'))
+        patch.setattr(stores, '_dictionary', None)
+        yield stores.load_store(path), stores.load_database(path)
+
+
+@pytest.mark.parametrize('dimension', ['Day', 'Meal', 'Restaurant', 'Cuisine', 'Food'])
+def test_cumulative_counts(backends, dimension):
+    memory, sqlite = (backend.cumulative_counts(dimension) for backend in backends)
+    assert list(memory.labels) == list(sqlite.labels)
+    np.testing.assert_array_equal(memory.dates, sqlite.dates)
+    np.testing.assert_array_equal(memory.counts, sqlite.counts)
+
+
+@pytest.mark.parametrize('cuisines', [False, True])
+def test_cube(backends, cuisines):
+    memory, sqlite = (backend.cube(cuisines) for backend in backends)
+    assert {dimension: list(labels) for dimension, labels in memory.labels.items()} == \
+           {dimension: list(labels) for dimension, labels in sqlite.labels.items()}
+    np.testing.assert_array_equal(memory.cells, sqlite.cells)
+    for measure in ('count', 'spent', 'quantity'):
+        np.testing.assert_array_equal(memory.measures[measure], sqlite.measures[measure])
+
+
+def test_date_totals(backends):
+    memory, sqlite = (backend.date_totals() for backend in backends)
+    pd.testing.assert_frame_equal(memory.by_platform(), sqlite.by_platform())
+    assert memory.totals() == sqlite.totals()
+
+
+@pytest.mark.parametrize('slot_minutes', [15, 60, 180])
+def test_day_time_counts(backends, slot_minutes):
+    memory, sqlite = (backend.day_time_counts(slot_minutes) for backend in backends)
+    pd.testing.assert_frame_equal(memory, sqlite)
+
+
+def test_platform_stats(backends):
+    memory, sqlite = (backend.platform_stats() for backend in backends)
+    assert list(memory) == list(sqlite)
+    for name in memory:
+        np.testing.assert_array_equal(memory[name].prices, sqlite[name].prices)
+        np.testing.assert_array_equal(memory[name].counts, sqlite[name].counts)
+        np.testing.assert_allclose(memory[name].box, sqlite[name].box)
+        np.testing.assert_array_equal(memory[name].outliers, sqlite[name].outliers)
+        np.testing.assert_allclose(memory[name].histogram[1], sqlite[name].histogram[1])
+        np.testing.assert_allclose(memory[name].kde[1], sqlite[name].kde[1])
+        pd.testing.assert_series_equal(memory[name].days, sqlite[name].days)
+        pd.testing.assert_series_equal(memory[name].meals, sqlite[name].meals)
+
+
+def test_platform_box_matches_plotly(backends):
+    # px.box puts quartile p at rank p * n - 0.5, which is numpy's 'hazen' method
+    for stats in backends[0].platform_stats().values():
+        prices = np.repeat(stats.prices, stats.counts)
+        np.testing.assert_allclose(stats.box[:3], np.quantile(prices, [0.25, 0.5, 0.75], method='hazen'))
+        lower, upper = stats.box[3:]
+        np.testing.assert_array_equal(stats.outliers, prices[(prices < lower) | (prices > upper)])
+
+
+def test_price_differences(backends):
+    memory, sqlite = (backend.price_differences('Zomato', 'Swiggy') for backend in backends)
+    assert memory == sqlite
+
+
+@pytest.mark.parametrize('column', ['Platform', 'Restaurant', 'Mode of Payment'])
+def test_value_counts(backends, column):
+    memory, sqlite = (backend.value_counts(column) for backend in backends)
+    pd.testing.assert_series_equal(memory, sqlite, check_index_type=False)
+
+
+def test_food_counts(backends):
+    memory, sqlite = (backend.food_counts() for backend in backends)
+    pd.testing.assert_series_equal(memory, sqlite, check_index_type=False)
+
+
+def test_price_counts(backends):
+    (memory_prices, memory_counts), (sqlite_prices, sqlite_counts) = (backend.price_counts() for backend in backends)
+    np.testing.assert_array_equal(memory_prices, sqlite_prices)
+    np.testing.assert_array_equal(memory_counts, sqlite_counts)
+
+
+def test_cuisine_prices(backends):
+    memory, sqlite = (backend.cuisine_prices() for backend in backends)
+    pd.testing.assert_frame_equal(memory, sqlite, check_dtype=False)
+
+
+@pytest.mark.parametrize('max_points', [20_000, 50])
+def test_order_prices(backends, max_points):
+    memory, sqlite = (backend.order_prices(max_points) for backend in backends)
+    assert len(memory) <= max_points
+    pd.testing.assert_frame_equal(memory, sqlite, check_dtype=False, check_index_type=False)
+
+
+def test_summary(backends):
+    memory, sqlite = (backend.summary for backend in backends)
+    assert (memory.orders, memory.spent, memory.rejected) == (sqlite.orders, sqlite.spent, sqlite.rejected)
+    assert memory.top_restaurants.top(10) == sqlite.top_restaurants.top(10)
+    assert memory.top_cuisines.top(3) == sqlite.top_cuisines.top(3)
+    np.testing.assert_allclose(memory.price_sketch.box_stats()[0], sqlite.price_sketch.box_stats()[0])